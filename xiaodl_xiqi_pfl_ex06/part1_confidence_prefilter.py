@@ -0,0 +1,366 @@
+"""
+PCL1 & PfL Exercise 6 - Part 1c (extension):
+Cheap pre-filter for the 0.9 Flair confidence bar
+
+- Builds hashed word n-gram features for every line (pure NumPy, no model download).
+- Trains a logistic regression on our cached Flair outputs:
+  lines of the selected speakers found in selected_speakers_<play>.json cleared
+  the 0.9 bar, the remaining lines of these speakers did not.
+- Tunes the decision threshold on a held-out calibration split for a given recall target.
+- Reports on a separate test split how much Flair inference is saved and how many
+  high-confidence lines are missed, i.e. what to expect on new lines.
+- Filters a sentence file so only promising lines are forwarded to analyze_sentiments().
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import re
+import sys
+import json
+import zlib
+import numpy as np
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+N_FEATURES = 2 ** 18     # size of the hashed feature space
+RECALL_TARGET = 0.98     # share of high-confidence lines that must still reach Flair
+CALIBRATION_SHARE = 0.2  # share of lines kept aside for threshold tuning
+TEST_SHARE = 0.2         # share of lines kept aside for the report
+EPOCHS = 300
+LEARNING_RATE = 0.5
+L2 = 1e-4
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+# Load sentences from a JSON file
+def load_sentences(path):
+    """
+    Load a JSON file with sentence dictionaries.
+
+    Args:
+        path (str): Path to the JSON file.
+    Returns:
+        list: List of sentence dictionaries.
+
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Save data as JSON to the given path
+def save_json(data, path):
+    """
+    Save Python data as JSON to the given path.
+
+    Args:
+        data (list of dict): Data to save.
+        path (str): Path to save the JSON file.
+
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+# Hashed n-gram features of one line
+def line_features(text):
+    """
+    Return the hashed feature ids of a line: word unigrams, word bigrams,
+    a length bucket and punctuation marks.
+
+    crc32 is used instead of hash() because hash() changes between Python runs.
+
+    Args:
+        text (str): The spoken line.
+    Returns:
+        list: Feature ids in [0, N_FEATURES).
+
+    """
+    tokens = TOKEN_RE.findall(text.lower())
+    grams = ["u:" + t for t in tokens]
+    grams += ["b:" + a + " " + b for a, b in zip(tokens, tokens[1:])]
+    grams.append(f"len:{min(len(tokens), 12)}")
+    grams += ["p:" + c for c in "!?;:," if c in text]
+
+    return [zlib.crc32(g.encode("utf-8")) % N_FEATURES for g in grams]
+
+
+# Sparse feature matrix of many lines
+def featurize(sentences):
+    """
+    Build a sparse (COO) feature matrix for the given sentences.
+    Every row is L2-normalised so that long lines do not dominate.
+
+    Args:
+        sentences (list of dict): List of sentence dictionaries.
+    Returns:
+        tuple: (rows, cols, vals, n_rows) as NumPy arrays plus the row count.
+
+    """
+    rows, cols = [], []
+    for i, s in enumerate(sentences):
+        ids = line_features(s["text"])
+        rows.extend([i] * len(ids))
+        cols.extend(ids)
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    n_rows = len(sentences)
+
+    nnz_per_row = np.bincount(rows, minlength=n_rows).astype(np.float64)
+    vals = 1.0 / np.sqrt(np.maximum(nnz_per_row, 1.0))[rows]
+    return rows, cols, vals, n_rows
+
+
+# X @ w for the sparse matrix
+def sparse_dot(matrix, weights):
+    rows, cols, vals, n_rows = matrix
+    return np.bincount(rows, weights=vals * weights[cols], minlength=n_rows)
+
+
+# X.T @ g for the sparse matrix
+def sparse_dot_transposed(matrix, gradient):
+    rows, cols, vals, _ = matrix
+    return np.bincount(cols, weights=vals * gradient[rows], minlength=N_FEATURES)
+
+
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+# Training labels from the cached Flair output
+def build_training_data(all_sentences, selected_sentences):
+    """
+    Label every line of the selected speakers: 1 if it appears in the
+    selected (score >= 0.9) file, 0 otherwise. Lines of other speakers were
+    never scored by Flair and are therefore left out.
+
+    Args:
+        all_sentences (list of dict): Content of all_sentences_<play>.json.
+        selected_sentences (list of dict): Content of selected_speakers_<play>.json.
+    Returns:
+        tuple: (sentences, labels) with labels as a NumPy array of 0/1.
+
+    """
+    speakers = {s["speaker"] for s in selected_sentences}
+    high_confidence = {s["sentence number"] for s in selected_sentences}
+
+    sentences = [s for s in all_sentences if s["speaker"] in speakers]
+    labels = np.array(
+        [1.0 if s["sentence number"] in high_confidence else 0.0 for s in sentences]
+    )
+    return sentences, labels
+
+
+# Logistic regression with full-batch gradient descent
+def train_logistic_regression(matrix, labels, epochs=EPOCHS, lr=LEARNING_RATE, l2=L2):
+    """
+    Fit a logistic regression on the sparse feature matrix.
+
+    Args:
+        matrix (tuple): Sparse matrix returned by featurize().
+        labels (np.ndarray): 0/1 target per row.
+        epochs (int): Number of gradient steps.
+        lr (float): Learning rate.
+        l2 (float): L2 regularisation strength.
+    Returns:
+        tuple: (weights, bias)
+
+    """
+    weights = np.zeros(N_FEATURES)
+    bias = np.log((labels.mean() + 1e-9) / (1 - labels.mean() + 1e-9))
+    n = len(labels)
+
+    for _ in range(epochs):
+        error = sigmoid(sparse_dot(matrix, weights) + bias) - labels
+        weights -= lr * (sparse_dot_transposed(matrix, error) / n + l2 * weights)
+        bias -= lr * error.mean()
+
+    return weights, bias
+
+
+# Threshold that keeps the requested recall
+def tune_threshold(probabilities, labels, recall_target=RECALL_TARGET):
+    """
+    Return the largest threshold whose recall on high-confidence lines
+    is at least recall_target.
+
+    Args:
+        probabilities (np.ndarray): Predicted probabilities.
+        labels (np.ndarray): 0/1 targets.
+        recall_target (float): Required recall, e.g. 0.98.
+    Returns:
+        float: Decision threshold.
+
+    """
+    positives = np.sort(probabilities[labels == 1])
+    if len(positives) == 0:
+        return 0.0
+
+    # Number of positives we are allowed to lose
+    allowed_misses = int(np.floor((1 - recall_target) * len(positives)))
+    return float(positives[allowed_misses])
+
+
+# Inference saved vs. lines missed
+def evaluate(probabilities, labels, threshold):
+    """
+    Summarise what the pre-filter would have done on labelled lines.
+
+    Args:
+        probabilities (np.ndarray): Predicted probabilities.
+        labels (np.ndarray): 0/1 targets.
+        threshold (float): Decision threshold.
+    Returns:
+        dict: Counts and shares of forwarded, saved and missed lines.
+
+    """
+    forwarded = probabilities >= threshold
+    positives = labels == 1
+    n = len(labels)
+
+    return {
+        "lines": n,
+        "forwarded": int(forwarded.sum()),
+        "inference_saved": float(1 - forwarded.mean()) if n else 0.0,
+        "high_confidence": int(positives.sum()),
+        "missed": int((positives & ~forwarded).sum()),
+        "recall": float(forwarded[positives].mean()) if positives.any() else 1.0,
+    }
+
+
+# Train, tune and evaluate the pre-filter
+def train_prefilter(all_sentences, selected_sentences, recall_target=RECALL_TARGET, seed=42):
+    """
+    Train the pre-filter on one play, tune its threshold on a calibration split
+    and evaluate it on a test split that was used for neither.
+
+    Args:
+        all_sentences (list of dict): Content of all_sentences_<play>.json.
+        selected_sentences (list of dict): Content of selected_speakers_<play>.json.
+        recall_target (float): Required recall on high-confidence lines.
+        seed (int): Random seed for the train / calibration / test split.
+    Returns:
+        tuple: (model, report) where model is a dict with weights, bias, threshold
+        and report is the evaluation on the test split.
+
+    """
+    sentences, labels = build_training_data(all_sentences, selected_sentences)
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(sentences))
+    n_test = int(len(sentences) * TEST_SHARE)
+    n_calibration = int(len(sentences) * CALIBRATION_SHARE)
+    test = order[:n_test]
+    calibration = order[n_test:n_test + n_calibration]
+    train = order[n_test + n_calibration:]
+
+    train_matrix = featurize([sentences[i] for i in train])
+    weights, bias = train_logistic_regression(train_matrix, labels[train])
+
+    def predict(ids):
+        return sigmoid(sparse_dot(featurize([sentences[i] for i in ids]), weights) + bias)
+
+    # Recall >= target holds on the calibration split by construction,
+    # so the report has to come from lines the threshold has not seen
+    threshold = tune_threshold(predict(calibration), labels[calibration], recall_target)
+
+    model = {"weights": weights, "bias": bias, "threshold": threshold}
+    return model, evaluate(predict(test), labels[test], threshold)
+
+
+# Save / load the model as a compressed NumPy archive
+def save_model(model, path):
+    np.savez_compressed(
+        path, weights=model["weights"], bias=model["bias"], threshold=model["threshold"]
+    )
+
+
+def load_model(path):
+    with np.load(path) as data:
+        return {
+            "weights": data["weights"],
+            "bias": float(data["bias"]),
+            "threshold": float(data["threshold"]),
+        }
+
+
+# Score the sentences and keep those likely to clear the 0.9 bar
+def prefilter_sentences(sentences, model):
+    """
+    Return the sentences that should be forwarded to analyze_sentiments().
+
+    Args:
+        sentences (list of dict): List of sentence dictionaries.
+        model (dict): Model returned by train_prefilter() or load_model().
+    Returns:
+        list of dict: Sentences predicted to reach high confidence.
+
+    """
+    if not sentences:
+        return []
+
+    probabilities = sigmoid(sparse_dot(featurize(sentences), model["weights"]) + model["bias"])
+    keep = probabilities >= model["threshold"]
+    return [s for s, k in zip(sentences, keep) if k]
+
+
+def print_report(report):
+    print(f"  Test lines:              {report['lines']}")
+    print(f"  Forwarded to Flair:      {report['forwarded']}")
+    print(f"  Inference saved:         {report['inference_saved']:.1%}")
+    print(f"  High-confidence missed:  {report['missed']} of {report['high_confidence']}"
+          f" (recall {report['recall']:.3f})")
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python part1_confidence_prefilter.py train <all_sentences_json> <selected_speakers_json> <model_npz> [recall_target]
+    python part1_confidence_prefilter.py filter <input_json> <model_npz> <output_json>
+    Returns the mode and its list of arguments.
+
+    """
+    args = sys.argv[1:]
+    valid = (
+        (len(args) in (4, 5) and args[0] == "train")
+        or (len(args) == 4 and args[0] == "filter")
+    )
+
+    if not valid:
+        print("Error: Missing required arguments\n")
+        print("Usage:")
+        print("  python part1_confidence_prefilter.py train <all_sentences_json> "
+              "<selected_speakers_json> <model_npz> [recall_target]")
+        print("  python part1_confidence_prefilter.py filter <input_json> "
+              "<model_npz> <output_json>\n")
+        print("Example:")
+        print("  python part1_confidence_prefilter.py train all_sentences_hamlet.json "
+              "selected_speakers_hamlet.json prefilter_hamlet.npz 0.98")
+        sys.exit(1)
+
+    return args[0], args[1:]
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    mode, args = system_setup()
+
+    with profile_stage("prefilter"):
+        if mode == "train":
+            recall_target = float(args[3]) if len(args) == 4 else RECALL_TARGET
+            print(f"Training pre-filter (recall target {recall_target})...")
+            model, report = train_prefilter(
+                load_sentences(args[0]), load_sentences(args[1]), recall_target
+            )
+            save_model(model, args[2])
+            print_report(report)
+            print(f"Model saved to: {args[2]}")
+        else:
+            sentences = load_sentences(args[0])
+            kept = prefilter_sentences(sentences, load_model(args[1]))
+            save_json(kept, args[2])
+            print(f"Forwarding {len(kept)} of {len(sentences)} lines "
+                  f"({1 - len(kept) / max(len(sentences), 1):.1%} inference saved)")
+            print(f"Saved to: {args[2]}")
@@ -0,0 +1,321 @@
+"""
+PCL1 & PfL Exercise 6 - Part 1c (extension):
+Faster CPU inference backends for the Flair sentiment model
+
+- Loads Flair's pre-trained "sentiment" TextClassifier.
+- Optionally turns it into a dynamically int8-quantised torch model ("int8")
+  or exports its transformer embeddings to a quantised ONNX Runtime model ("onnx").
+- Scores sentences in mini-batches and keeps those with score >= 0.9.
+- Checks the label agreement of a backend against the cached full-precision
+  labels in selected_speakers_<play>.json before it is used for a real run.
+- Using a Command Line Interface (CLI) to select the backend by flag.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import os
+import sys
+import json
+import time
+from flair.models import TextClassifier
+from flair.data import Sentence
+from pipeline_profiling import pop_profile_flags, profile_stage, sampled_call, profiling_enabled
+
+BACKENDS = ["full", "int8", "onnx"]
+CONFIDENCE_THRESHOLD = 0.9  # same cut-off as in the Part 1 solution
+MINI_BATCH_SIZE = 32
+ONNX_DIR = "flair_onnx"  # exported / optimised / quantised ONNX files go here
+
+# Short example lines used to trace the transformer during ONNX export
+EXAMPLE_TEXTS = [
+    "To be, or not to be: that is the question:",
+    "O, my offence is rank it smells to heaven;",
+]
+
+
+# Load sentences from a JSON file
+def load_sentences(path):
+    """
+    Load the JSON file with (selected speaker) sentences.
+
+    Args:
+        path (str): Path to the JSON file.
+    Returns:
+        list: List of sentence dictionaries.
+
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Save data as JSON to the given path
+def save_json(data, path):
+    """
+    Save Python data as JSON to the given path.
+
+    Args:
+        data (list of dict): Data to save.
+        path (str): Path to save the JSON file.
+
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+# Dynamic int8 quantisation of all Linear layers (torch backend)
+def quantize_torch(classifier):
+    """
+    Return a copy of the classifier whose Linear layers use dynamic int8 quantisation.
+
+    Weights are stored as int8 and activations are quantised on the fly,
+    which is where nearly all CPU time of the transformer is spent.
+
+    Args:
+        classifier (TextClassifier): Full-precision Flair classifier.
+    Returns:
+        TextClassifier: Quantised classifier (CPU only).
+
+    """
+    import torch
+
+    return torch.quantization.quantize_dynamic(
+        classifier, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+# Export the transformer embeddings to ONNX Runtime (onnx backend)
+def export_onnx(classifier, onnx_dir=ONNX_DIR):
+    """
+    Replace the transformer embeddings of the classifier by an optimised,
+    int8-quantised ONNX Runtime model. The small decoder stays in torch.
+    The export runs only once: if the quantised model already exists in onnx_dir
+    it is loaded directly (delete the directory to re-export, e.g. after a Flair update).
+
+    Args:
+        classifier (TextClassifier): Full-precision Flair classifier.
+        onnx_dir (str): Directory for the exported ONNX files.
+    Returns:
+        TextClassifier: Classifier running its embeddings on ONNX Runtime.
+
+    """
+    quantized_path = os.path.join(onnx_dir, "sentiment-embeddings-quantized.onnx")
+    if os.path.exists(quantized_path):
+        # Same constructor Flair's export_onnx() uses for the exported model
+        classifier.embeddings = classifier.embeddings.onnx_cls(
+            onnx_model=quantized_path,
+            providers=["CPUExecutionProvider"],
+            **classifier.embeddings.to_args(),
+        )
+        return classifier
+
+    os.makedirs(onnx_dir, exist_ok=True)
+    examples = [Sentence(text) for text in EXAMPLE_TEXTS]
+
+    embeddings = classifier.embeddings.export_onnx(
+        os.path.join(onnx_dir, "sentiment-embeddings.onnx"),
+        examples,
+        providers=["CPUExecutionProvider"],
+    )
+    embeddings.optimize_model(
+        os.path.join(onnx_dir, "sentiment-embeddings-optimized.onnx"),
+        opt_level=2,
+        use_gpu=False,
+        only_onnxruntime=True,
+    )
+    embeddings.quantize_model(
+        quantized_path,
+        extra_options={"DisableShapeInference": True},
+    )
+
+    classifier.embeddings = embeddings
+    return classifier
+
+
+# Load Flair's sentiment classifier for the selected backend
+def load_classifier(backend="full"):
+    """
+    Load Flair's pre-trained sentiment classifier and convert it to the given backend.
+
+    Args:
+        backend (str): One of "full", "int8" or "onnx".
+    Returns:
+        TextClassifier: Classifier ready for CPU inference.
+
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+    print(f"Loading Flair sentiment model (backend: {backend})...")
+    classifier = TextClassifier.load("sentiment")
+    classifier.eval()
+
+    if backend == "int8":
+        return quantize_torch(classifier)
+    if backend == "onnx":
+        return export_onnx(classifier)
+    return classifier
+
+
+# One forward pass (sampled in detail when profiling)
+@sampled_call("flair_predict")
+def predict_batch(classifier, flair_sentences):
+    classifier.predict(flair_sentences, mini_batch_size=len(flair_sentences))
+
+
+# Predict label and score for every sentence (mini-batched)
+def score_sentences(sentences, classifier, mini_batch_size=MINI_BATCH_SIZE):
+    """
+    Add a "sentiment" field (label, score) to every sentence.
+
+    Args:
+        sentences (list of dict): List of sentence dictionaries.
+        classifier (TextClassifier): Classifier returned by load_classifier().
+        mini_batch_size (int): Number of sentences per forward pass.
+    Returns:
+        list of dict: The same sentence dictionaries with sentiment data.
+
+    """
+    flair_sentences = [Sentence(s["text"]) for s in sentences]
+
+    if not profiling_enabled():
+        # One call, so Flair can sort the whole input by length before batching
+        classifier.predict(flair_sentences, mini_batch_size=mini_batch_size)
+    else:
+        # Same length ordering, but one call per mini-batch so that calls can be sampled
+        by_length = sorted(flair_sentences, key=len, reverse=True)
+        for start in range(0, len(by_length), mini_batch_size):
+            predict_batch(classifier, by_length[start:start + mini_batch_size])
+
+    for sentence_dict, flair_sentence in zip(sentences, flair_sentences):
+        sentiment_label = flair_sentence.labels[0]
+        sentence_dict["sentiment"] = {
+            "label": sentiment_label.value,
+            "score": sentiment_label.score,
+        }
+    return sentences
+
+
+def analyze_sentiments(sentences, backend="full", classifier=None):
+    """
+    Analyze sentiments of the given sentences using Flair.
+
+    Only keeps sentences with sentiment score >= 0.9 (high confidence).
+
+    Args:
+        sentences (list of dict): List of sentence dictionaries.
+        backend (str): Inference backend, one of "full", "int8" or "onnx".
+        classifier (TextClassifier): Already loaded classifier (optional).
+    Returns:
+        list of dict: Filtered list with only high-confidence sentiment sentences.
+
+    """
+    if classifier is None:
+        classifier = load_classifier(backend)
+
+    scored = score_sentences(sentences, classifier)
+    return [s for s in scored if s["sentiment"]["score"] >= CONFIDENCE_THRESHOLD]
+
+
+# Compare a backend with the cached full-precision Flair labels
+def check_label_agreement(reference, classifier):
+    """
+    Re-score the reference sentences with the given classifier and compare labels.
+
+    Args:
+        reference (list of dict): Sentences that already carry full-precision
+            "sentiment" data, e.g. selected_speakers_hamlet.json.
+        classifier (TextClassifier): Classifier to verify.
+    Returns:
+        dict: agreement rate, number of disagreements, number of sentences
+        that fall below the 0.9 threshold, and sentences per second.
+
+    """
+    # Work on copies so that the cached labels are not overwritten
+    copies = [{"text": s["text"]} for s in reference]
+
+    start = time.perf_counter()
+    score_sentences(copies, classifier)
+    elapsed = time.perf_counter() - start
+
+    disagreements = 0
+    below_threshold = 0
+    for ref, new in zip(reference, copies):
+        if ref["sentiment"]["label"] != new["sentiment"]["label"]:
+            disagreements += 1
+        if new["sentiment"]["score"] < CONFIDENCE_THRESHOLD:
+            below_threshold += 1
+
+    total = len(reference)
+    return {
+        "sentences": total,
+        "agreement": (total - disagreements) / total if total else 1.0,
+        "disagreements": disagreements,
+        "below_threshold": below_threshold,
+        "sentences_per_second": total / elapsed if elapsed else 0.0,
+    }
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python part1_flair_backends.py <input_json_file> <output_json_file> [--backend full|int8|onnx] [--verify <reference_json>]
+    Returns input_path, output_path, backend, reference_path (None if not given).
+
+    """
+    args = sys.argv[1:]
+    backend = "full"
+    reference_path = None
+
+    if "--backend" in args:
+        i = args.index("--backend")
+        backend = args[i + 1] if i + 1 < len(args) else ""
+        del args[i:i + 2]
+    if "--verify" in args:
+        i = args.index("--verify")
+        reference_path = args[i + 1] if i + 1 < len(args) else None
+        del args[i:i + 2]
+
+    if len(args) != 2 or backend not in BACKENDS:
+        print("Error: Missing or invalid arguments\n")
+        print(
+            "Usage: python part1_flair_backends.py <input_json_file> "
+            "<output_json_file> [--backend full|int8|onnx] [--verify <reference_json>]\n"
+        )
+        print("Example:")
+        print(
+            "  python part1_flair_backends.py "
+            "selected_speakers_hamlet.json "
+            "selected_speakers_hamlet_int8.json "
+            "--backend int8 --verify selected_speakers_hamlet.json"
+        )
+        sys.exit(1)
+
+    return args[0], args[1], backend, reference_path
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    input_path, output_path, backend, reference_path = system_setup()
+
+    with profile_stage("load_classifier"):
+        classifier = load_classifier(backend)
+
+    # Verify the backend first, a faster model is useless if labels change
+    if reference_path:
+        print(f"Verifying {backend} backend against {reference_path}...")
+        with profile_stage("verify_backend"):
+            report = check_label_agreement(load_sentences(reference_path), classifier)
+        print(f"  Label agreement:   {report['agreement']:.4f} "
+              f"({report['disagreements']} of {report['sentences']} differ)")
+        print(f"  Now below 0.9:     {report['below_threshold']}")
+        print(f"  Throughput:        {report['sentences_per_second']:.1f} sentences/s")
+
+    sentences = load_sentences(input_path)
+    print(f"Analyzing {len(sentences)} sentences...")
+    with profile_stage("analyze_sentiments"):
+        high_confidence = analyze_sentiments(sentences, backend, classifier=classifier)
+    save_json(high_confidence, output_path)
+
+    print(f"Saved {len(high_confidence)} high-confidence sentences to {output_path}")
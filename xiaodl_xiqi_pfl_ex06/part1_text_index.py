@@ -0,0 +1,269 @@
+"""
+PCL1 & PfL Exercise 6 - Part 1b (extension):
+Inverted full-text index over the extracted lines
+
+- Builds an inverted index (token -> sentence numbers -> token positions) from
+  all_sentences_<play>.json (JSON array or NDJSON) and stores it as text_index_<play>.json.
+  This is a separate step: run "python part1_text_index.py build <play>" after the
+  extraction, and again whenever all_sentences_<play>.json changes.
+- Answers boolean queries: terms are combined with AND, alternatives with OR,
+  "-term" / NOT term excludes, and "quoted phrases" must appear in this order.
+- Queries can be combined with speaker and act filters, like filter_sentences()
+  in the speaker selector.
+- Assembles targeted annotation sets (e.g. all lines about "death") from many plays.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import re
+import sys
+import json
+from part2_ndjson import iter_sentences
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+QUERY_RE = re.compile(r'-?"[^"]+"|\S+')
+
+
+# Split a line into lower-case word tokens
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+# Load sentences from a JSON or NDJSON file
+def load_sentences(path):
+    """
+    Load the file with all sentences (JSON array or NDJSON, see part2_ndjson.py).
+
+    Args:
+        path (str): Path to the sentence file.
+    Returns:
+        list: List of sentence dictionaries.
+
+    """
+    return list(iter_sentences(path))
+
+
+# Save data as JSON to the given path
+def save_json(data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+# Build the inverted index
+def build_index(sentences):
+    """
+    Build an inverted index over the given sentences.
+
+    Args:
+        sentences (iterable of dict): Sentences as extracted from the XML file.
+    Returns:
+        dict: {
+            "speakers": {sentence number: speaker},
+            "acts": {sentence number: act},
+            "postings": {token: {sentence number: [positions]}}
+        }
+        Sentence numbers are stored as strings so the index survives a JSON round trip.
+
+    """
+    speakers = {}
+    acts = {}
+    postings = {}
+
+    for s in sentences:
+        sid = str(s["sentence number"])
+        speakers[sid] = s["speaker"]
+        acts[sid] = s["act"]
+        for position, token in enumerate(tokenize(s["text"])):
+            postings.setdefault(token, {}).setdefault(sid, []).append(position)
+
+    return {"speakers": speakers, "acts": acts, "postings": postings}
+
+
+# Build and persist the index of one play (run manually after sentence extraction)
+def index_play(play_name):
+    """
+    Build the index for all_sentences_<play>.json and save it as text_index_<play>.json.
+
+    Args:
+        play_name (str): e.g. "hamlet".
+    Returns:
+        str: Path of the saved index.
+
+    """
+    sentences = iter_sentences(f"all_sentences_{play_name}.json")
+    path = f"text_index_{play_name}.json"
+    save_json(build_index(sentences), path)
+    return path
+
+
+def load_index(play_name):
+    with open(f"text_index_{play_name}.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Sentences containing a phrase (consecutive tokens)
+def phrase_ids(index, tokens):
+    """
+    Return the sentence numbers in which the tokens appear next to each other.
+
+    Args:
+        index (dict): Index returned by build_index().
+        tokens (list of str): Phrase tokens.
+    Returns:
+        set: Matching sentence numbers (as strings).
+
+    """
+    postings = index["postings"]
+    if not tokens or any(t not in postings for t in tokens):
+        return set()
+
+    # Candidates must contain every token; start with the rarest one
+    by_frequency = sorted(set(tokens), key=lambda t: len(postings[t]))
+    candidates = set(postings[by_frequency[0]])
+    for token in by_frequency[1:]:
+        candidates &= postings[token].keys()
+
+    matches = set()
+    for sid in candidates:
+        starts = set(postings[tokens[0]][sid])
+        for offset, token in enumerate(tokens[1:], start=1):
+            starts &= {p - offset for p in postings[token][sid]}
+            if not starts:
+                break
+        if starts:
+            matches.add(sid)
+    return matches
+
+
+# Parse and evaluate a boolean query
+def search(index, query, speakers=None, acts=None):
+    """
+    Evaluate a query against the index.
+
+    Query syntax: words are combined with AND, "OR" separates alternatives,
+    "-word" or "NOT word" excludes, "two words" in quotes is a phrase.
+    Example: 'death OR "to be" -sleep'
+
+    Args:
+        index (dict): Index returned by build_index() or load_index().
+        query (str): The query.
+        speakers (list of str): Only keep these speakers (None = all).
+        acts (list of str): Only keep these acts (None = all).
+    Returns:
+        list of int: Matching sentence numbers in play order.
+
+    """
+    result = set()
+    for alternative in re.split(r"\s+OR\s+", query.strip()):
+        include, exclude = [], []
+        negate = False
+        for term in QUERY_RE.findall(alternative):
+            if term == "NOT":
+                negate = True
+                continue
+            if term.startswith("-"):
+                negate, term = True, term[1:]
+            tokens = tokenize(term)
+            # Punctuation-only terms such as "!" have no tokens and are ignored
+            if tokens:
+                (exclude if negate else include).append(phrase_ids(index, tokens))
+            negate = False
+
+        if not include:
+            continue
+        ids = set.intersection(*include)
+        for excluded in exclude:
+            ids -= excluded
+        result |= ids
+
+    if speakers is not None:
+        result = {sid for sid in result if index["speakers"][sid] in speakers}
+    if acts is not None:
+        result = {sid for sid in result if index["acts"][sid] in acts}
+    return sorted(int(sid) for sid in result)
+
+
+# Filter sentences by speaker and by a text query
+def filter_sentences(sentences, index, query, chosen_speakers=None, acts=None):
+    """
+    Return only sentences that match the query (and the chosen speakers / acts).
+
+    Args:
+        sentences (iterable of dict): All sentences of the play.
+        index (dict): Index of the same play.
+        query (str): Boolean / phrase query, see search().
+        chosen_speakers (list of str): Speakers to keep (None = all).
+        acts (list of str): Acts to keep (None = all).
+    Returns:
+        list: Filtered list of sentence dictionaries.
+
+    """
+    ids = set(search(index, query, chosen_speakers, acts))
+    return [s for s in sentences if s["sentence number"] in ids]
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python part1_text_index.py build <play> [<play> ...]
+    python part1_text_index.py query "<query>" <play> [<play> ...] [--speaker NAME] [--act ACT] [--output FILE]
+    Returns mode, arguments and options.
+
+    """
+    args = sys.argv[1:]
+    options = {"--speaker": [], "--act": [], "--output": []}
+    for flag in options:
+        while flag in args:
+            i = args.index(flag)
+            options[flag].append(args[i + 1] if i + 1 < len(args) else "")
+            del args[i:i + 2]
+
+    valid = (
+        (len(args) >= 2 and args[0] == "build")
+        or (len(args) >= 3 and args[0] == "query")
+    )
+    if not valid:
+        print("Error: Missing required arguments\n")
+        print("Usage:")
+        print("  python part1_text_index.py build <play> [<play> ...]")
+        print('  python part1_text_index.py query "<query>" <play> [<play> ...] '
+              "[--speaker NAME] [--act ACT] [--output FILE]\n")
+        print("Example:")
+        print('  python part1_text_index.py query \'death OR "to be"\' hamlet macbeth '
+              '--speaker HAMLET --output death_lines.json')
+        sys.exit(1)
+
+    return args[0], args[1:], options
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    mode, args, options = system_setup()
+
+    with profile_stage("text_index"):
+        if mode == "build":
+            for play_name in args:
+                print(f"Indexed {play_name}: {index_play(play_name)}")
+        else:
+            query, play_names = args[0], args[1:]
+            speakers = options["--speaker"] or None
+            acts = options["--act"] or None
+
+            selected = []
+            for play_name in play_names:
+                matches = filter_sentences(
+                    iter_sentences(f"all_sentences_{play_name}.json"),
+                    load_index(play_name), query, speakers, acts,
+                )
+                print(f"{play_name}: {len(matches)} matching lines")
+                selected.extend(dict(s, play=play_name) for s in matches)
+
+            if options["--output"]:
+                save_json(selected, options["--output"][0])
+                print(f"Saved {len(selected)} lines to {options['--output'][0]}")
+            else:
+                for s in selected[:20]:
+                    print(f"  [{s['play']} {s['act']}] {s['speaker']}: {s['text']}")
@@ -0,0 +1,226 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2.1.3 (extension):
+Agreement between Flair and GPT sentiment labels
+
+- Encodes flair_label (POSITIVE / NEGATIVE) and gpt_sentiment (positive / negative / neutral)
+  on the same three categories.
+- Computes confusion matrices, raw agreement and Cohen's kappa with NumPy.
+- Bootstrap confidence intervals: all resamples are drawn as one batched index array
+  and scored with a single bincount, no Python loop over resamples.
+- Agreement overall, per speaker and per act, for one or many plays.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from part2_sentiment_stats import load_excel
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+CATEGORIES = ["positive", "negative", "neutral"]
+N_RESAMPLES = 10000
+CONFIDENCE = 0.95
+BATCH_SIZE = 2000  # resamples scored at once, bounds memory to BATCH_SIZE x rows
+
+
+# Map both label columns to integer codes
+def encode_labels(df):
+    """
+    Encode Flair and GPT labels as category codes (index into CATEGORIES).
+    Rows where either label is missing or unknown are dropped.
+
+    Args:
+        df (pd.DataFrame): Rows with flair_label and gpt_sentiment columns.
+    Returns:
+        tuple: (flair_codes, gpt_codes, valid) where valid is a boolean mask over df rows.
+
+    """
+    lookup = {c: i for i, c in enumerate(CATEGORIES)}
+    flair = df["flair_label"].astype(str).str.lower().map(lookup)
+    gpt = df["gpt_sentiment"].astype(str).str.lower().map(lookup)
+
+    valid = (flair.notna() & gpt.notna()).to_numpy()
+    return (flair[valid].to_numpy(dtype=np.int64),
+            gpt[valid].to_numpy(dtype=np.int64),
+            valid)
+
+
+# Confusion matrix (rows: Flair, columns: GPT)
+def confusion_matrix(flair_codes, gpt_codes, k=len(CATEGORIES)):
+    """
+    Count every (Flair, GPT) label pair.
+
+    Returns:
+        np.ndarray: k x k matrix, rows are Flair labels and columns GPT labels.
+
+    """
+    return np.bincount(flair_codes * k + gpt_codes, minlength=k * k).reshape(k, k)
+
+
+# Raw agreement and Cohen's kappa, for one or a stack of confusion matrices
+def agreement_and_kappa(matrices):
+    """
+    Compute observed agreement and Cohen's kappa.
+
+    Args:
+        matrices (np.ndarray): Confusion matrix of shape (k, k) or a batch of shape (b, k, k).
+    Returns:
+        tuple: (agreement, kappa), scalars or arrays of length b.
+
+    """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    total = matrices.sum(axis=(-2, -1))
+
+    observed = np.trace(matrices, axis1=-2, axis2=-1) / total
+    rows = matrices.sum(axis=-1) / total[..., None]
+    cols = matrices.sum(axis=-2) / total[..., None]
+    expected = (rows * cols).sum(axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kappa = np.where(expected < 1, (observed - expected) / (1 - expected), 1.0)
+    # [()] turns the 0-d result of a single matrix back into a scalar
+    return observed, kappa[()]
+
+
+# Bootstrap confidence intervals for agreement and kappa
+def bootstrap_ci(flair_codes, gpt_codes, n_resamples=N_RESAMPLES,
+                 confidence=CONFIDENCE, seed=42):
+    """
+    Percentile bootstrap intervals for agreement and Cohen's kappa.
+
+    Each batch draws a (batch, n) index array, looks up the joint label code of
+    every drawn row and counts all confusion matrices with one bincount.
+
+    Args:
+        flair_codes (np.ndarray): Encoded Flair labels.
+        gpt_codes (np.ndarray): Encoded GPT labels.
+        n_resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level, e.g. 0.95.
+        seed (int): Random seed.
+    Returns:
+        dict: Lower/upper bounds for agreement and kappa.
+
+    """
+    k = len(CATEGORIES)
+    n = len(flair_codes)
+    if n == 0:
+        return {"agreement_low": np.nan, "agreement_high": np.nan,
+                "kappa_low": np.nan, "kappa_high": np.nan}
+
+    rng = np.random.default_rng(seed)
+    joint = flair_codes * k + gpt_codes
+    agreements, kappas = [], []
+
+    for start in range(0, n_resamples, BATCH_SIZE):
+        b = min(BATCH_SIZE, n_resamples - start)
+        idx = rng.integers(0, n, size=(b, n))
+        # Offset every resample into its own block of k * k bins
+        codes = joint[idx] + (np.arange(b) * k * k)[:, None]
+        matrices = np.bincount(codes.ravel(), minlength=b * k * k).reshape(b, k, k)
+        agreement, kappa = agreement_and_kappa(matrices)
+        agreements.append(agreement)
+        kappas.append(kappa)
+
+    agreements = np.concatenate(agreements)
+    kappas = np.concatenate(kappas)
+    tail = (1 - confidence) / 2 * 100
+    return {
+        "agreement_low": np.percentile(agreements, tail),
+        "agreement_high": np.percentile(agreements, 100 - tail),
+        "kappa_low": np.nanpercentile(kappas, tail),
+        "kappa_high": np.nanpercentile(kappas, 100 - tail),
+    }
+
+
+# Agreement summary for one set of rows
+def agreement_summary(flair_codes, gpt_codes, n_resamples=N_RESAMPLES, seed=42):
+    agreement, kappa = agreement_and_kappa(confusion_matrix(flair_codes, gpt_codes))
+    summary = {"n": len(flair_codes), "agreement": agreement, "kappa": kappa}
+    summary.update(bootstrap_ci(flair_codes, gpt_codes, n_resamples, seed=seed))
+    return summary
+
+
+# Agreement per speaker, act, ...
+def grouped_agreement(df, by, n_resamples=N_RESAMPLES, seed=42):
+    """
+    Compute agreement, kappa and bootstrap intervals per group.
+
+    Args:
+        df (pd.DataFrame): Rows with flair_label, gpt_sentiment and the grouping column(s).
+        by (str or list of str): Column(s) to group by, e.g. "speaker" or ["play", "act"].
+        n_resamples (int): Number of bootstrap resamples per group.
+        seed (int): Random seed.
+    Returns:
+        pd.DataFrame: One row per group.
+
+    """
+    flair_codes, gpt_codes, valid = encode_labels(df)
+    keys = df.loc[valid, by] if isinstance(by, list) else df.loc[valid, [by]]
+    group_ids, uniques = pd.MultiIndex.from_frame(keys).factorize()
+
+    rows = []
+    for gid, key in enumerate(uniques):
+        mask = group_ids == gid
+        summary = agreement_summary(flair_codes[mask], gpt_codes[mask], n_resamples, seed)
+        rows.append(dict(zip(keys.columns, key), **summary))
+    return pd.DataFrame(rows)
+
+
+# Read one or more annotation Excel files into one table
+def load_plays(paths):
+    """
+    Load annotation Excel files and add a "play" column taken from the file name
+    (sentiment_analysis_<play>.xlsx -> <play>).
+
+    Args:
+        paths (list of str): Excel files produced by part2_call_API.py.
+    Returns:
+        pd.DataFrame: All rows of all files.
+
+    """
+    frames = []
+    for path in paths:
+        df = load_excel(path)
+        df.columns = [c.strip().lower() for c in df.columns]
+        name = os.path.splitext(os.path.basename(path))[0]
+        df["play"] = name.replace("sentiment_analysis_", "")
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def print_confusion_matrix(matrix):
+    print("{:<12}".format("Flair \\ GPT") + "".join(f"{c:>10}" for c in CATEGORIES))
+    for category, row in zip(CATEGORIES, matrix):
+        print(f"{category:<12}" + "".join(f"{v:>10}" for v in row))
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    if len(sys.argv) < 2:
+        print("Error: Missing required arguments\n")
+        print("Usage: python part2_agreement.py <excel_file> [<excel_file> ...]\n")
+        print("Example:")
+        print("  python part2_agreement.py sentiment_analysis_hamlet.xlsx")
+        sys.exit(1)
+
+    with profile_stage("agreement"):
+        df = load_plays(sys.argv[1:])
+        flair_codes, gpt_codes, _ = encode_labels(df)
+
+        print("Confusion matrix (all plays):")
+        print_confusion_matrix(confusion_matrix(flair_codes, gpt_codes))
+
+        overall = agreement_summary(flair_codes, gpt_codes)
+        print(f"\nAgreement: {overall['agreement']:.3f} "
+              f"[{overall['agreement_low']:.3f}, {overall['agreement_high']:.3f}]")
+        print(f"Cohen's kappa: {overall['kappa']:.3f} "
+              f"[{overall['kappa_low']:.3f}, {overall['kappa_high']:.3f}]")
+
+        with pd.option_context("display.width", 160, "display.float_format", "{:.3f}".format):
+            print("\nPer speaker:")
+            print(grouped_agreement(df, ["play", "speaker"]).to_string(index=False))
+            print("\nPer act:")
+            print(grouped_agreement(df, ["play", "act"]).to_string(index=False))
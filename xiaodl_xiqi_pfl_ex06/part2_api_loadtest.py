@@ -0,0 +1,179 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2a (extension):
+Offline load test for the GPT call path
+
+- Points the OpenAI client at the mock server of part2_mock_openai.py (OPENAI_BASE_URL),
+  either started in-process or already running at --base-url.
+- Calls analyze_with_gpt() for the first --limit sentences of a JSON file with one or more
+  concurrency levels and reports calls/sec, p50 / p99 latency (including the client's
+  retries), failed calls and what the server saw (requests, 429 / 500, tokens).
+- Optionally runs process_file() end to end against the mock as a baseline.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+from part2_mock_openai import MockOpenAI, DEFAULT_LATENCY, start_background
+from part2_query_loadtest import percentile
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+CONCURRENCY_LEVELS = [1, 8, 32]
+MAX_RETRIES = 2   # default of the OpenAI client
+LIMIT = 200       # sentences per level; ~2 min at concurrency 1 with the default mock latency
+
+
+# Mock server statistics (GET / DELETE /stats)
+def server_stats(base_url, reset=False):
+    root = base_url.rsplit("/v1", 1)[0]
+    request = Request(f"{root}/stats", method="DELETE" if reset else "GET")
+    with urlopen(request) as response:
+        return json.load(response)
+
+
+# One timed analyze_with_gpt() call
+def timed_call(analyze, text, client):
+    start = time.perf_counter()
+    result = analyze(text, client)
+    return time.perf_counter() - start, result.get("sentiment") is None
+
+
+# Drive analyze_with_gpt() with the given concurrency
+def run_load_test(texts, client, analyze, base_url, concurrency):
+    """
+    Annotate all texts with `concurrency` threads and collect the numbers.
+
+    Args:
+        texts (list of str): Sentences to send.
+        client (OpenAI): Client pointing at the mock server.
+        analyze (callable): analyze_with_gpt(text, client).
+        base_url (str): Base URL of the mock server (for /stats).
+        concurrency (int): Number of parallel calls.
+    Returns:
+        dict: calls, seconds, calls_per_second, p50_ms, p99_ms, failed calls
+        and the server statistics of this run.
+
+    """
+    server_stats(base_url, reset=True)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda text: timed_call(analyze, text, client), texts))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in outcomes]
+    return {
+        "concurrency": concurrency,
+        "calls": len(texts),
+        "seconds": elapsed,
+        "calls_per_second": len(texts) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "failed": sum(failed for _, failed in outcomes),
+        "server": server_stats(base_url),
+    }
+
+
+def print_report(report):
+    server = report["server"]
+    status = server["status"]
+    print(f"{report['concurrency']:>11} {report['calls']:>6} {report['seconds']:>8.2f} "
+          f"{report['calls_per_second']:>9.1f} {report['p50_ms']:>8.0f} {report['p99_ms']:>8.0f} "
+          f"{report['failed']:>6} {server['requests']:>8} {status.get('429', 0):>5} "
+          f"{status.get('500', 0):>5} {server['total_tokens']:>8}")
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python part2_api_loadtest.py <input_json_file> [--concurrency 1,8,32] [--base-url URL]
+        [--latency SPEC] [--error-429 P] [--error-500 P] [--rpm N] [--max-retries N]
+        [--limit N] [--process-file <output_excel_file>]
+    --limit 0 sends every sentence of the file.
+    Returns input_path and the options.
+
+    """
+    args = sys.argv[1:]
+    options = {
+        "--concurrency": ",".join(str(c) for c in CONCURRENCY_LEVELS),
+        "--base-url": None,
+        "--latency": DEFAULT_LATENCY,
+        "--error-429": "0",
+        "--error-500": "0",
+        "--rpm": None,
+        "--max-retries": str(MAX_RETRIES),
+        "--limit": str(LIMIT),
+        "--process-file": None,
+    }
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1] if i + 1 < len(args) else ""
+            del args[i:i + 2]
+
+    if len(args) != 1 or not options["--limit"].isdigit():
+        print("Error: Missing or invalid arguments\n")
+        print("Usage: python part2_api_loadtest.py <input_json_file> [--concurrency 1,8,32] "
+              "[--base-url URL] [--latency SPEC] [--error-429 P] [--error-500 P] [--rpm N] "
+              "[--max-retries N] [--limit N] [--process-file <output_excel_file>]\n")
+        print("Example:")
+        print("  python part2_api_loadtest.py selected_speakers_hamlet.json "
+              "--concurrency 1,8,32 --latency lognormal:0.3:0.5 --error-429 0.05")
+        sys.exit(1)
+
+    return args[0], options
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    input_path, options = system_setup()
+
+    base_url = options["--base-url"]
+    if base_url is None:
+        mock = MockOpenAI(
+            latency=options["--latency"],
+            error_429=float(options["--error-429"]),
+            error_500=float(options["--error-500"]),
+            rpm=int(options["--rpm"]) if options["--rpm"] else None,
+        )
+        server, base_url = start_background(mock)
+        print(f"Started mock server at {base_url}")
+
+    # Must be set before part2_call_API creates its client
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    from openai import OpenAI
+    from part2_call_API import analyze_with_gpt, load_json, process_file
+
+    client = OpenAI(max_retries=int(options["--max-retries"]))
+    texts = [item["text"] for item in load_json(input_path)]
+    limit = int(options["--limit"])
+    if limit:
+        texts = texts[:limit]
+    print(f"Sending {len(texts)} sentences per concurrency level")
+    levels = [int(c) for c in options["--concurrency"].split(",") if c]
+
+    print(f"{'concurrency':>11} {'calls':>6} {'wall s':>8} {'calls/s':>9} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'failed':>6} {'requests':>8} {'429':>5} {'500':>5} {'tokens':>8}")
+    for concurrency in levels:
+        with profile_stage(f"api_loadtest_c{concurrency}"):
+            report = run_load_test(texts, client, analyze_with_gpt, base_url, concurrency)
+        print_report(report)
+
+    if options["--process-file"]:
+        print("\nRunning process_file() against the mock...")
+        server_stats(base_url, reset=True)
+        start = time.perf_counter()
+        with profile_stage("api_loadtest_process_file"):
+            process_file(input_path, options["--process-file"], max_per_speaker=50)
+        elapsed = time.perf_counter() - start
+        stats = server_stats(base_url)
+        print(f"process_file: {elapsed:.2f} s, {stats['requests']} requests, "
+              f"{stats['total_tokens']} tokens")
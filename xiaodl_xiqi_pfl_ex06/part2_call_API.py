@@ -17,6 +17,10 @@ import random
 from openpyxl import Workbook
 from openai import OpenAI
 from tqdm import tqdm  # for progress bar
+from part2_ndjson import is_ndjson, iter_ndjson, iter_sentences
+from part2_sentence_store import SentenceTable
+from part2_routing import ROUTING_POLICY, load_cache, save_cache, annotate_sentence, summarize_sources
+from pipeline_profiling import pop_profile_flags, profile_stage, sampled_call
 
 
 SYSTEM_MESSAGE = """
@@ -39,8 +43,11 @@ Rules:
 def load_json(path):
     """"
     Load JSON data from a file.
+    Both array-style JSON and NDJSON (one record per line) files are accepted.
 
     """
+    if is_ndjson(path):
+        return list(iter_ndjson(path))
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
@@ -48,16 +55,15 @@ def load_json(path):
 def group_sentences_by_speaker(data):
     """
     Group sentences by speaker.
-    
+    data can be a SentenceTable (see part2_sentence_store.py) or a list of sentence dicts.
+
     Returns a dictionary with speaker names as keys
-    and lists of their sentences as values.
+    and sequences of their sentences as values (views into the table, no copies).
 
     """
-    grouped = {}
-    for item in data:
-        speaker = item["speaker"]
-        grouped.setdefault(speaker, []).append(item)
-    return grouped
+    if not isinstance(data, SentenceTable):
+        data = SentenceTable.from_records(data)
+    return data.group_by_speaker()
 
 # In addition to the full set of King and Hamlet lines, 
 # we randomly sampled 100 sentences from the combined pool of the two speakers.
@@ -79,6 +85,7 @@ def sample_random_sentences(grouped_data, total_samples=100):
     return random.sample(combined, total_samples)
 
 # GPT Emotion + Sentiment
+@sampled_call("analyze_with_gpt")
 def analyze_with_gpt(text, client):
     """
     Analyze text with GPT to get main emotion and sentiment.
@@ -115,7 +122,7 @@ def save_to_excel(rows, output_path):
     ws.append([
         "act", "scene", "speaker", "sentence number", "text",
         "flair_label", "flair_score",
-        "gpt_main_emotion", "gpt_sentiment"
+        "gpt_main_emotion", "gpt_sentiment", "annotation_source"
     ])
 
     for row in rows:
@@ -129,6 +136,7 @@ def save_to_excel(rows, output_path):
             row["flair_score"],
             row["gpt_main_emotion"],
             row["gpt_sentiment"],
+            row.get("annotation_source", "gpt"),
         ])
 
     wb.save(output_path)
@@ -138,7 +146,7 @@ def save_to_excel(rows, output_path):
 def system_setup():
     """
     Setup command line arguments:
-    python part2_call_API.py <input_json_file> <output_excel_file> <max_sentences_per_speaker>
+    python part2_call_API.py <input_json_file> <output_excel_file> <max_sentences_per_speaker> [--route] [--profile]
     Returns input_path, output_path, max_per_speaker.
 
     """
@@ -166,19 +174,22 @@ def system_setup():
     return input_path, output_path, max_per_speaker
 
 # Main Processing Function
-def process_file(input_path, output_path, max_per_speaker):
+def process_file(input_path, output_path, max_per_speaker, routing=False):
     """
     Process the input file and perform emotion analysis.
     
     input_path: Path to the input JSON file.
     output_path: Path to the output Excel file.
     max_per_speaker: Maximum sentences per speaker to analyze.
+    routing: If True, only sentences that need it are sent to GPT,
+             cached lines are filled from the GPT cache, lines routed to Flair
+             keep their gpt_* columns empty (see part2_routing.py).
 
     """
     print("Loading JSON...")
 
-    # Load JSON
-    data = load_json(input_path)
+    # Load JSON (or NDJSON) straight into the compact sentence table
+    data = SentenceTable.from_records(iter_sentences(input_path))
 
     # Group by speaker
     grouped = group_sentences_by_speaker(data)
@@ -188,8 +199,8 @@ def process_file(input_path, output_path, max_per_speaker):
     print("HAMLET total:", len(grouped.get("HAMLET", [])))
 
     # Full sentences for KING and HAMLET
-    king_sentences = grouped.get("KING CLAUDIUS", [])
-    hamlet_sentences = grouped.get("HAMLET", [])
+    king_sentences = list(grouped.get("KING CLAUDIUS", []))
+    hamlet_sentences = list(grouped.get("HAMLET", []))
 
     # Random sample 100 sentences from combined KING + HAMLET pool
     sampled_sentences = sample_random_sentences(grouped, total_samples=100)
@@ -204,6 +215,8 @@ def process_file(input_path, output_path, max_per_speaker):
     # Call GPT API for each sentence
     client = OpenAI()
     results = []
+    sources = []
+    cache = load_cache() if routing else None
 
     print("\nAnalyzing sentences with ChatGPT...\n")
 
@@ -213,7 +226,11 @@ def process_file(input_path, output_path, max_per_speaker):
         flair_label = item["sentiment"]["label"]
         flair_score = item["sentiment"]["score"]
 
-        gpt_result = analyze_with_gpt(text, client)
+        if routing:
+            source, gpt_result = annotate_sentence(item, client, cache, ROUTING_POLICY, analyze_with_gpt)
+        else:
+            source, gpt_result = "gpt", analyze_with_gpt(text, client)
+        sources.append(source)
 
         results.append({
             "act": item["act"],
@@ -225,18 +242,34 @@ def process_file(input_path, output_path, max_per_speaker):
             "flair_score": flair_score,
             "gpt_main_emotion": gpt_result.get("main_emotion"),
             "gpt_sentiment": gpt_result.get("sentiment"),
+            "annotation_source": source,
         })
 
+    if routing:
+        save_cache(cache)
+        summary = summarize_sources(sources)
+        print(f"\nGPT calls: {summary['gpt']}, from Flair: {summary['flair']}, "
+              f"from cache: {summary['cache']} ({summary['avoided']:.1%} of calls avoided)")
+
     save_to_excel(results, output_path)
 
 
 if __name__ == "__main__":
     print("Starting Emotion Analysis...\n")
 
+    # Optional flags: --profile (see pipeline_profiling.py) and --route
+    pop_profile_flags()
+
+    # Route confident sentences away from GPT
+    routing = "--route" in sys.argv
+    if routing:
+        sys.argv.remove("--route")
+
     # Aquire parameters of command line
     input_path, output_path, max_per_speaker = system_setup()
 
     # Run Process_file function
-    process_file(input_path, output_path, max_per_speaker)
+    with profile_stage("process_file"):
+        process_file(input_path, output_path, max_per_speaker, routing=routing)
 
     print("\nEmotion Analysis Completed.")
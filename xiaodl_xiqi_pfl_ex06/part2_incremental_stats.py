@@ -0,0 +1,362 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2.1.3 (extension):
+Incremental statistics with persisted aggregates
+
+- Keeps running aggregates per play / speaker / act / scene in a JSON file:
+  GPT sentiment label counts, GPT main emotion counts, sum and count of |flair_score|
+  and the number of highly emotional sentences (|flair_score| >= 0.90).
+- Merges new annotation batches (e.g. one more play or a few newly annotated rows)
+  in O(new rows) instead of rereading the whole table.
+- Every merged row is recorded by a row key, so merging the same file twice, or a
+  rewritten file with a few extra rows, only adds the rows that were not seen before.
+- Exposes the same outputs as part2_sentiment_stats.py
+  (count_sentiment_per_character(), sentiment_distribution_by_act(), ...).
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import os
+import sys
+import json
+import hashlib
+import pandas as pd
+from collections import defaultdict, Counter
+from part2_sentiment_stats import print_section
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+SENTIMENTS = ["positive", "negative", "neutral"]
+HIGH_EMOTION_THRESHOLD = 0.90
+KEY_SEPARATOR = "\t"  # cell keys are "play<TAB>speaker<TAB>act<TAB>scene"
+
+
+# Empty aggregate store
+def new_aggregates():
+    """
+    Create an empty aggregate store.
+
+    Returns:
+        dict: {"batches": [...], "row_keys": [...], "cells": {cell_key: cell}}
+
+    """
+    return {"batches": [], "row_keys": [], "cells": {}}
+
+
+def new_cell():
+    return {
+        "positive": 0,
+        "negative": 0,
+        "neutral": 0,
+        "rows": 0,
+        "flair_abs_sum": 0.0,
+        "flair_count": 0,
+        "high_emotion": 0,
+        "emotions": {},
+    }
+
+
+# Load / save the persisted aggregates
+def load_aggregates(path):
+    """
+    Load the aggregate store from a JSON file, or start a new one if it does not exist.
+
+    Args:
+        path (str): Path to the aggregates JSON file.
+    Returns:
+        dict: Aggregate store.
+
+    """
+    if not os.path.exists(path):
+        return new_aggregates()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_aggregates(aggregates, path):
+    """
+    Save the aggregate store to a JSON file (written to a temporary file first,
+    so an interrupted run never leaves a half-written store behind).
+
+    Args:
+        aggregates (dict): Aggregate store.
+        path (str): Path to the aggregates JSON file.
+
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(aggregates, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+# Stable keys of the rows of one batch
+def row_keys(df, play):
+    """
+    Build one key per row from play, act, scene, speaker, sentence number and text.
+
+    part2_call_API.py can write the same sentence twice (the random sample is drawn
+    from lines that are already included), so the n-th copy of a row gets "#n" added
+    to its key and is still counted.
+
+    Args:
+        df (pd.DataFrame): Annotation rows.
+        play (str): Play the rows belong to.
+    Returns:
+        list of str: Short hex digest per row.
+
+    """
+    seen = Counter()
+    keys = []
+    columns = ["act", "scene", "speaker", "sentence number", "text"]
+    for values in df[columns].astype(str).itertuples(index=False):
+        raw = KEY_SEPARATOR.join([play, *values])
+        seen[raw] += 1
+        keys.append(hashlib.sha1(f"{raw}#{seen[raw]}".encode("utf-8")).hexdigest()[:16])
+    return keys
+
+
+# Merge one annotation batch into the aggregates
+def merge_batch(aggregates, df, play, batch_id=None):
+    """
+    Add the rows of a new annotation batch to the running aggregates.
+
+    Rows whose key (see row_keys()) was merged before are skipped, so only the
+    new rows are grouped and the existing cells are updated in place.
+    Annotations of rows that were already merged are not updated.
+
+    Args:
+        aggregates (dict): Aggregate store.
+        df (pd.DataFrame): New rows with act, scene, speaker, sentence number, text,
+            flair_score, gpt_sentiment and gpt_main_emotion columns.
+        play (str): Play the rows belong to, e.g. "hamlet".
+        batch_id (str): Name of the batch, kept for information (e.g. the file path).
+    Returns:
+        int: Number of rows that were new and have been merged.
+
+    """
+    # Stores written before row keys were added have no "row_keys" field
+    known = set(aggregates.setdefault("row_keys", []))
+    keys = row_keys(df, play)
+    is_new = [key not in known for key in keys]
+    df = df[is_new].copy()
+    if df.empty:
+        return 0
+
+    df["flair_abs"] = pd.to_numeric(df["flair_score"], errors="coerce").abs()
+    df["high_emotion"] = df["flair_abs"] >= HIGH_EMOTION_THRESHOLD
+    for sentiment in SENTIMENTS:
+        df[sentiment] = df["gpt_sentiment"] == sentiment
+
+    grouped = df.groupby(["speaker", "act", "scene"], sort=False).agg(
+        positive=("positive", "sum"),
+        negative=("negative", "sum"),
+        neutral=("neutral", "sum"),
+        rows=("flair_abs", "size"),
+        flair_abs_sum=("flair_abs", "sum"),
+        flair_count=("flair_abs", "count"),
+        high_emotion=("high_emotion", "sum"),
+    )
+
+    cells = aggregates["cells"]
+    for (speaker, act, scene), values in grouped.iterrows():
+        key = KEY_SEPARATOR.join([play, str(speaker), str(act), str(scene)])
+        cell = cells.setdefault(key, new_cell())
+        for field, value in values.items():
+            cell[field] += float(value) if field == "flair_abs_sum" else int(value)
+
+    emotions = df.groupby(["speaker", "act", "scene", "gpt_main_emotion"], sort=False).size()
+    for (speaker, act, scene, emotion), count in emotions.items():
+        key = KEY_SEPARATOR.join([play, str(speaker), str(act), str(scene)])
+        # Stores written before emotion counts were added have no "emotions" field
+        cell_emotions = cells[key].setdefault("emotions", {})
+        cell_emotions[emotion] = cell_emotions.get(emotion, 0) + int(count)
+
+    aggregates["row_keys"].extend(key for key, new in zip(keys, is_new) if new)
+    if batch_id is not None and batch_id not in aggregates["batches"]:
+        aggregates["batches"].append(batch_id)
+    return len(df)
+
+
+# Merge an Excel file produced by part2_call_API.py
+def merge_excel(aggregates, path, play):
+    """
+    Merge the rows of an annotation Excel file that have not been merged yet.
+    A file that was rewritten with a few more annotated rows only adds those rows.
+
+    Args:
+        aggregates (dict): Aggregate store.
+        path (str): Path to the Excel file.
+        play (str): Play the file belongs to.
+    Returns:
+        int: Number of new rows merged (0 if nothing was new).
+
+    """
+    return merge_batch(aggregates, pd.read_excel(path), play, f"{play}:{os.path.abspath(path)}")
+
+
+# Iterate over the cells, optionally for one play only
+def iter_cells(aggregates, play=None):
+    for key, cell in aggregates["cells"].items():
+        cell_play, speaker, act, scene = key.split(KEY_SEPARATOR)
+        if play is None or cell_play == play:
+            yield cell_play, speaker, act, scene, cell
+
+
+def _sentiment_counts(aggregates, dimension, play):
+    counts = defaultdict(lambda: Counter({"positive": 0, "negative": 0, "neutral": 0}))
+    for cell_play, speaker, act, scene, cell in iter_cells(aggregates, play):
+        key = {"speaker": speaker, "act": act, "scene": scene}[dimension]
+        for sentiment in SENTIMENTS:
+            counts[key][sentiment] += cell[sentiment]
+    return counts
+
+
+# Count positive/negative/neutral per character
+def count_sentiment_per_character(aggregates, play=None):
+    """
+    Count the number of positive, negative, and neutral sentences per character.
+    Args:
+        aggregates (dict): Aggregate store.
+        play (str): Restrict to one play (None = all plays).
+    Returns:
+        defaultdict: Counts of sentiments per character.
+
+    """
+    return _sentiment_counts(aggregates, "speaker", play)
+
+
+# Sentiment distribution across ACTs
+def sentiment_distribution_by_act(aggregates, play=None):
+    """
+    Compute sentiment distribution across acts.
+    Returns:
+        defaultdict: Counts of sentiments per act.
+
+    """
+    return _sentiment_counts(aggregates, "act", play)
+
+
+# Sentiment distribution across SCENEs
+def sentiment_distribution_by_scene(aggregates, play=None):
+    """
+    Compute sentiment distribution across scenes.
+    Returns:
+        defaultdict: Counts of sentiments per scene.
+
+    """
+    return _sentiment_counts(aggregates, "scene", play)
+
+
+# Total number of merged rows
+def total_lines(aggregates, play=None):
+    """
+    Count all merged rows.
+    Returns:
+        int: Number of rows.
+
+    """
+    return sum(cell["rows"] for *_, cell in iter_cells(aggregates, play))
+
+
+# Rows without a GPT sentiment (routed to Flair, see part2_routing.py)
+def count_unlabelled(aggregates, play=None):
+    """
+    Count the merged rows that the sentiment counts skip.
+    Returns:
+        int: Number of rows without gpt_sentiment.
+
+    """
+    return sum(cell["rows"] - sum(cell[s] for s in SENTIMENTS)
+               for *_, cell in iter_cells(aggregates, play))
+
+
+# Count highly emotional sentences (|flair_score| ≥ 0.90)
+def count_high_emotion(aggregates, play=None):
+    """
+    Count the number of highly emotional sentences (|flair_score| ≥ 0.90).
+    Returns:
+        int: Count of highly emotional sentences.
+
+    """
+    return sum(cell["high_emotion"] for *_, cell in iter_cells(aggregates, play))
+
+
+# Additional: average emotional intensity per character
+def average_intensity_per_character(aggregates, play=None):
+    """
+    Compute average emotional intensity (mean |flair_score|) per character.
+    Returns:
+        dict: Average emotional intensity per character.
+
+    """
+    sums = defaultdict(float)
+    counts = defaultdict(int)
+    for cell_play, speaker, act, scene, cell in iter_cells(aggregates, play):
+        sums[speaker] += cell["flair_abs_sum"]
+        counts[speaker] += cell["flair_count"]
+    return {s: sums[s] / counts[s] if counts[s] else 0 for s in sums}
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python part2_incremental_stats.py <aggregates_json> <play> [<excel_file> ...]
+    Returns aggregates_path, play, excel_paths.
+
+    """
+    if len(sys.argv) < 3:
+        print("Error: Missing required arguments\n")
+        print("Usage: python part2_incremental_stats.py <aggregates_json> "
+              "<play> [<excel_file> ...]\n")
+        print("Example:")
+        print("  python part2_incremental_stats.py sentiment_aggregates.json "
+              "hamlet sentiment_analysis_hamlet.xlsx")
+        sys.exit(1)
+
+    return sys.argv[1], sys.argv[2], sys.argv[3:]
+
+
+# Main function to run the analysis
+def main():
+    aggregates_path, play, excel_paths = system_setup()
+    aggregates = load_aggregates(aggregates_path)
+
+    for path in excel_paths:
+        merged = merge_excel(aggregates, path, play)
+        if merged:
+            print(f"Merged {merged} new rows: {path}")
+        else:
+            print(f"Nothing new, skipped: {path}")
+    save_aggregates(aggregates, aggregates_path)
+    unlabelled = count_unlabelled(aggregates, play)
+
+    print_section(f"1) Sentiment Count per Character ({play})")
+    for speaker, cnt in count_sentiment_per_character(aggregates, play).items():
+        print(f"{speaker}: {dict(cnt)}")
+    print(f"(skipped {unlabelled} rows without GPT sentiment)")
+
+    print_section("2) Sentiment Distribution Across Acts")
+    for act, cnt in sentiment_distribution_by_act(aggregates, play).items():
+        print(f"{act}: {dict(cnt)}")
+    print(f"(skipped {unlabelled} rows without GPT sentiment)")
+
+    print_section("2b) Sentiment Distribution Across Scenes")
+    for scene, cnt in sentiment_distribution_by_scene(aggregates, play).items():
+        print(f"{scene}: {dict(cnt)}")
+    print(f"(skipped {unlabelled} rows without GPT sentiment)")
+
+    print_section("3) Total Lines and Highly Emotional Sentences")
+    print(f"Total lines = {total_lines(aggregates, play)}")
+    print(f"|flair_score| >= {HIGH_EMOTION_THRESHOLD} = {count_high_emotion(aggregates, play)}")
+
+    print_section("4) Average Emotional Intensity per Character")
+    for speaker, avg in average_intensity_per_character(aggregates, play).items():
+        print(f"{speaker}: {avg:.4f}")
+
+    print("\n Analysis complete.")
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    with profile_stage("incremental_stats"):
+        main()
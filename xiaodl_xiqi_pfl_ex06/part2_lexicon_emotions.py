@@ -0,0 +1,380 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2a (extension):
+Offline lexicon-based emotion annotation
+
+- Loads a word-emotion lexicon in the NRC Emotion Lexicon format
+  (one "word<TAB>emotion<TAB>0/1" entry per line) for the 8 Plutchik emotions
+  used in the GPT prompt, plus positive / negative.
+- Normalises early-modern English before the lookup (thee / thou / thy, hath, doth,
+  o'er, lov'd, speaketh, know'st, ...), once per distinct word form.
+- Scores all lines at once with a sparse line x word matrix (NumPy bincount).
+- Gives main_emotion and sentiment for every line of every play in seconds, either
+  as a standalone annotation or as baseline columns next to gpt_main_emotion.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+from part2_ndjson import iter_sentences
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+# Same order as in SYSTEM_MESSAGE of part2_call_API.py
+EMOTIONS = ["anger", "anticipation", "disgust", "fear", "joy", "sadness", "surprise", "trust"]
+# Polarity of each emotion (+1 / -1, 0 for surprise), used to break ties
+EMOTION_POLARITY = np.array([-1, 1, -1, -1, 1, -1, 0, 1])
+POLARITIES = ["positive", "negative"]
+COLUMNS = EMOTIONS + POLARITIES
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)*")
+
+# Whole-word replacements for early-modern English
+ARCHAIC_WORDS = {
+    "thee": "you", "thou": "you", "ye": "you", "thy": "your", "thine": "your",
+    "art": "are", "hath": "has", "hast": "have", "doth": "does", "dost": "do",
+    "didst": "did", "wilt": "will", "shalt": "shall", "canst": "can",
+    "wouldst": "would", "shouldst": "should", "couldst": "could",
+    "o'er": "over", "e'er": "ever", "ne'er": "never", "e'en": "even",
+    "tis": "it", "twas": "it",
+    "oft": "often", "ere": "before", "nay": "no", "aye": "yes", "ay": "yes",
+    "methinks": "think", "whilst": "while", "mine": "my",
+}
+
+
+# Load the word-emotion lexicon
+def load_lexicon(path):
+    """
+    Load a lexicon file with "word<TAB>emotion<TAB>flag" lines (NRC format).
+    Emotions outside the 8 Plutchik categories and positive / negative are ignored.
+
+    Args:
+        path (str): Path to the lexicon file.
+    Returns:
+        dict: {"words": {word: row},
+               "matrix": np.ndarray (n_words x 10), emotion columns weighted by
+                         1 / (number of emotions of the word), polarity columns 0 / 1,
+               "prior": np.ndarray (8,), share of each emotion over all lexicon entries}
+
+    """
+    column = {name: i for i, name in enumerate(COLUMNS)}
+    words = {}
+    entries = []
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 3 or parts[1] not in column or parts[2] != "1":
+                continue
+            row = words.setdefault(parts[0].lower(), len(words))
+            entries.append((row, column[parts[1]]))
+
+    matrix = np.zeros((len(words), len(COLUMNS)), dtype=np.float64)
+    if entries:
+        rows, cols = np.asarray(entries).T
+        matrix[rows, cols] = 1.0
+
+    # A word with one emotion is stronger evidence than a word with six
+    emotion_part = matrix[:, :len(EMOTIONS)]
+    prior = emotion_part.sum(axis=0) / max(emotion_part.sum(), 1.0)
+    n_emotions = emotion_part.sum(axis=1, keepdims=True)
+    matrix[:, :len(EMOTIONS)] = np.divide(emotion_part, n_emotions,
+                                          out=np.zeros_like(emotion_part), where=n_emotions > 0)
+    return {"words": words, "matrix": matrix, "prior": prior}
+
+
+# Candidate modern forms of one (lower-case) word
+def word_variants(word):
+    """
+    Return the forms to try in the lexicon, most specific first.
+
+    Args:
+        word (str): Lower-case token.
+    Returns:
+        list of str: Candidate forms.
+
+    """
+    word = ARCHAIC_WORDS.get(word, word)
+    variants = [word]
+
+    if word.endswith("'d"):                  # lov'd -> loved / love
+        stem = word[:-2]
+        variants += [stem + "ed", stem + "e", stem]
+    elif word.endswith("'st"):               # know'st -> know
+        variants.append(word[:-3])
+    elif word.endswith("eth") and len(word) > 5:   # speaketh -> speak, loveth -> love
+        stem = word[:-3]
+        variants += [stem, stem + "e", stem + "s"]
+    elif word.endswith("est") and len(word) > 5:   # speakest -> speak
+        stem = word[:-3]
+        variants += [stem, stem + "e"]
+
+    # Plain English inflection as a last resort
+    for suffix, repl in (("ies", "y"), ("ing", ""), ("ing", "e"), ("ed", ""), ("ed", "e"),
+                         ("es", ""), ("s", ""), ("ly", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            variants.append(word[:-len(suffix)] + repl)
+
+    return [v.replace("'", "") for v in variants]
+
+
+# Map a word to its lexicon row (or -1)
+def resolve_word(word, lexicon):
+    words = lexicon["words"]
+    for variant in word_variants(word):
+        if variant in words:
+            return words[variant]
+    return -1
+
+
+# Sparse line x word matrix
+def build_line_matrix(texts, lexicon):
+    """
+    Tokenise all lines and map every token to its lexicon row.
+    Each distinct word form is normalised only once.
+
+    Args:
+        texts (list of str): Lines to score.
+        lexicon (dict): Lexicon returned by load_lexicon().
+    Returns:
+        tuple: (line ids, lexicon rows) of all tokens found in the lexicon.
+
+    """
+    resolved = {}
+    lines, rows = [], []
+    for i, text in enumerate(texts):
+        for token in TOKEN_RE.findall(text.lower()):
+            row = resolved.get(token)
+            if row is None:
+                row = resolved[token] = resolve_word(token, lexicon)
+            if row >= 0:
+                lines.append(i)
+                rows.append(row)
+    return np.asarray(lines, dtype=np.int64), np.asarray(rows, dtype=np.int64)
+
+
+# Emotion and polarity counts per line
+def score_lines(texts, lexicon):
+    """
+    Sum the (weighted) lexicon hits of every emotion and count the polarity hits per line.
+
+    Args:
+        texts (list of str): Lines to score.
+        lexicon (dict): Lexicon returned by load_lexicon().
+    Returns:
+        np.ndarray: (n_lines x 10) scores in the order of COLUMNS.
+
+    """
+    lines, rows = build_line_matrix(texts, lexicon)
+    n_cols = len(COLUMNS)
+
+    # One bincount over flattened (line, column) cells instead of a Python loop
+    cells = (lines[:, None] * n_cols + np.arange(n_cols)).ravel()
+    counts = np.bincount(cells, weights=lexicon["matrix"][rows].ravel(),
+                         minlength=len(texts) * n_cols)
+    return counts.reshape(len(texts), n_cols)
+
+
+# Turn the counts into the same labels GPT returns
+def label_lines(scores, lexicon):
+    """
+    Derive main_emotion and sentiment from the scores.
+
+    Sentiment is positive / negative by the larger count and neutral on a tie.
+    main_emotion is the emotion with the highest weighted score. Remaining ties are
+    narrowed to the emotions that match the line's sentiment and then decided by the
+    lexicon-wide emotion prior, so every line with an emotion word gets one;
+    only lines without any emotion word get None.
+
+    Args:
+        scores (np.ndarray): Output of score_lines().
+        lexicon (dict): Lexicon returned by load_lexicon() (for the prior).
+    Returns:
+        tuple: (list of main emotions, list of sentiments)
+
+    """
+    emotion_scores = scores[:, :len(EMOTIONS)]
+    polarity = np.sign(scores[:, len(EMOTIONS)] - scores[:, len(EMOTIONS) + 1])
+
+    # Weighted sums are floats, so "tied" means equal up to rounding
+    best_score = emotion_scores.max(axis=1, keepdims=True)
+    top = (emotion_scores >= best_score - 1e-9) & (emotion_scores > 0)
+    matching = top & (EMOTION_POLARITY == polarity[:, None]) & (polarity[:, None] != 0)
+    candidates = np.where(matching.any(axis=1, keepdims=True), matching, top)
+
+    best = np.where(candidates, lexicon["prior"], -1.0).argmax(axis=1)
+    has_emotion = best_score[:, 0] > 0
+    main_emotions = [EMOTIONS[b] if hit else None for b, hit in zip(best, has_emotion)]
+    sentiments = [{1: "positive", -1: "negative"}.get(p, "neutral") for p in polarity]
+    return main_emotions, sentiments
+
+
+def annotate_texts(texts, lexicon):
+    """
+    Annotate lines with the lexicon.
+
+    Args:
+        texts (list of str): Lines to annotate.
+        lexicon (dict): Lexicon returned by load_lexicon().
+    Returns:
+        list of dict: {"main_emotion", "sentiment"} per line, like analyze_with_gpt().
+
+    """
+    main_emotions, sentiments = label_lines(score_lines(texts, lexicon), lexicon)
+    return [{"main_emotion": e, "sentiment": s} for e, s in zip(main_emotions, sentiments)]
+
+
+# Drop-in replacement for analyze_with_gpt(text, client)
+def make_analyzer(lexicon):
+    """
+    Return a function with the signature of analyze_with_gpt(), so the lexicon can be
+    used wherever GPT is (e.g. annotate_sentence() in part2_routing.py).
+
+    Args:
+        lexicon (dict): Lexicon returned by load_lexicon().
+    Returns:
+        callable: analyze(text, client=None) -> {"main_emotion", "sentiment"}
+
+    """
+    def analyze(text, client=None):
+        return annotate_texts([text], lexicon)[0]
+    return analyze
+
+
+# Standalone annotation of whole plays
+def annotate_plays(paths, lexicon):
+    """
+    Annotate every line of the given sentence files.
+
+    Args:
+        paths (list of str): all_sentences_<play>.json files (array or NDJSON).
+        lexicon (dict): Lexicon returned by load_lexicon().
+    Returns:
+        pd.DataFrame: One row per line with lexicon_main_emotion and lexicon_sentiment.
+
+    """
+    frames = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        df = pd.DataFrame(
+            list(iter_sentences(path)),
+            columns=["act", "scene", "speaker", "sentence number", "text"],
+        )
+        df.insert(0, "play", name.replace("all_sentences_", ""))
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+
+    main_emotions, sentiments = label_lines(score_lines(df["text"].tolist(), lexicon), lexicon)
+    df["lexicon_main_emotion"] = main_emotions
+    df["lexicon_sentiment"] = sentiments
+    return df
+
+
+# Baseline columns next to the GPT annotation
+def add_baseline_columns(df, lexicon):
+    """
+    Insert lexicon_main_emotion / lexicon_sentiment right after the GPT columns.
+
+    Args:
+        df (pd.DataFrame): Rows of sentiment_analysis_<play>.xlsx.
+        lexicon (dict): Lexicon returned by load_lexicon().
+    Returns:
+        pd.DataFrame: Copy of df with the two baseline columns.
+
+    """
+    df = df.drop(columns=["lexicon_main_emotion", "lexicon_sentiment"], errors="ignore")
+    main_emotions, sentiments = label_lines(score_lines(df["text"].astype(str).tolist(), lexicon), lexicon)
+
+    position = df.columns.get_loc("gpt_sentiment") + 1
+    df.insert(position, "lexicon_main_emotion", main_emotions)
+    df.insert(position + 1, "lexicon_sentiment", sentiments)
+    return df
+
+
+# How often does the lexicon agree with GPT?
+def baseline_agreement(df):
+    """
+    Compare the lexicon columns with the GPT columns.
+
+    Args:
+        df (pd.DataFrame): Output of add_baseline_columns().
+    Returns:
+        dict: coverage (lines with a main emotion), emotion agreement on covered
+        lines, sentiment agreement. Lines without a GPT label (e.g. routed to Flair)
+        are left out of both agreements.
+
+    """
+    covered = df["lexicon_main_emotion"].notna()
+    with_emotion = covered & df["gpt_main_emotion"].notna()
+    with_sentiment = df["gpt_sentiment"].notna()
+    emotion_agree = (df.loc[with_emotion, "lexicon_main_emotion"]
+                     == df.loc[with_emotion, "gpt_main_emotion"])
+    sentiment_agree = (df.loc[with_sentiment, "lexicon_sentiment"]
+                       == df.loc[with_sentiment, "gpt_sentiment"])
+    return {
+        "lines": len(df),
+        "coverage": covered.mean() if len(df) else 0.0,
+        "emotion_agreement": emotion_agree.mean() if with_emotion.any() else 0.0,
+        "sentiment_agreement": sentiment_agree.mean() if with_sentiment.any() else 0.0,
+    }
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python part2_lexicon_emotions.py annotate <lexicon_file> <output_excel> <json_file> [<json_file> ...]
+    python part2_lexicon_emotions.py baseline <lexicon_file> <excel_file> [<output_excel>]
+    Returns mode, lexicon_path and the remaining paths.
+    <output_excel> defaults to <excel_file name>_lexicon.xlsx, the input is never overwritten.
+
+    """
+    args = sys.argv[1:]
+    valid = (
+        len(args) >= 4 and args[0] == "annotate"
+        or len(args) in (3, 4) and args[0] == "baseline"
+    )
+    if not valid:
+        print("Error: Missing required arguments\n")
+        print("Usage:")
+        print("  python part2_lexicon_emotions.py annotate <lexicon_file> <output_excel> "
+              "<json_file> [<json_file> ...]")
+        print("  python part2_lexicon_emotions.py baseline <lexicon_file> <excel_file> "
+              "[<output_excel>]\n")
+        print("Example:")
+        print("  python part2_lexicon_emotions.py baseline "
+              "NRC-Emotion-Lexicon-Wordlevel-v0.92.txt sentiment_analysis_hamlet.xlsx")
+        sys.exit(1)
+
+    return args[0], args[1], args[2:]
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    mode, lexicon_path, paths = system_setup()
+    lexicon = load_lexicon(lexicon_path)
+    print(f"Loaded {len(lexicon['words'])} lexicon words from {lexicon_path}")
+
+    if mode == "annotate":
+        output_path, json_paths = paths[0], paths[1:]
+        with profile_stage("lexicon_annotate"):
+            df = annotate_plays(json_paths, lexicon)
+        df.to_excel(output_path, index=False)
+        covered = df["lexicon_main_emotion"].notna().mean()
+        print(f"Annotated {len(df)} lines ({covered:.1%} with a main emotion) -> {output_path}")
+    else:
+        excel_path = paths[0]
+        output_path = paths[1] if len(paths) > 1 else os.path.splitext(excel_path)[0] + "_lexicon.xlsx"
+        with profile_stage("lexicon_baseline"):
+            df = add_baseline_columns(pd.read_excel(excel_path), lexicon)
+        df.to_excel(output_path, index=False)
+
+        report = baseline_agreement(df)
+        print(f"Lines:                      {report['lines']}")
+        print(f"With a main emotion:        {report['coverage']:.1%}")
+        print(f"Emotion agreement w/ GPT:   {report['emotion_agreement']:.1%}")
+        print(f"Sentiment agreement w/ GPT: {report['sentiment_agreement']:.1%}")
+        print(f"Saved to {output_path}")
@@ -0,0 +1,303 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2a (extension):
+Local mock of the OpenAI chat-completions API
+
+- Answers POST /v1/chat/completions like the real API, with a JSON
+  {"main_emotion", "sentiment"} message that is derived from the sentence text,
+  so analyze_with_gpt() runs unchanged against it (OPENAI_BASE_URL).
+- Latency is drawn from a configurable distribution (fixed, uniform or lognormal).
+- Injects 429 (rate limit) and 500 (server error) responses with given probabilities,
+  and optionally throttles to a requests-per-minute budget like a real account.
+- Counts requests, status codes and prompt / completion tokens (GET /stats).
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import sys
+import json
+import time
+import zlib
+import random
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+HOST = "127.0.0.1"
+PORT = 8766
+DEFAULT_LATENCY = "lognormal:0.6:0.5"   # median 0.6 s, roughly what gpt-4o-mini takes
+RETRY_AFTER_MS = 200
+
+EMOTIONS = ["anger", "anticipation", "disgust", "fear", "joy", "sadness", "surprise", "trust"]
+SENTIMENTS = ["positive", "negative", "neutral"]
+
+
+# Parse "fixed:0.5", "uniform:0.1:0.9" or "lognormal:<median>:<sigma>"
+def parse_latency(spec):
+    """
+    Turn a latency spec into a function that draws one delay in seconds.
+
+    Args:
+        spec (str): "fixed:<s>", "uniform:<low>:<high>" or "lognormal:<median>:<sigma>".
+    Returns:
+        callable: rng -> delay in seconds.
+
+    """
+    kind, *params = spec.split(":")
+    try:
+        params = [float(p) for p in params]
+    except ValueError:
+        raise ValueError(f"Invalid latency spec {spec!r}")
+
+    if kind == "fixed" and len(params) == 1:
+        return lambda rng: params[0]
+    if kind == "uniform" and len(params) == 2:
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "lognormal" and len(params) == 2:
+        median, sigma = params
+        return lambda rng: median * rng.lognormvariate(0.0, sigma)
+    raise ValueError(f"Invalid latency spec {spec!r}")
+
+
+# Rough token count (about 4 characters per token for English)
+def estimate_tokens(text):
+    return max(1, round(len(text) / 4))
+
+
+# Deterministic answer for a sentence
+def mock_annotation(text):
+    h = zlib.crc32(text.encode("utf-8"))
+    return {"main_emotion": EMOTIONS[h % len(EMOTIONS)],
+            "sentiment": SENTIMENTS[(h // len(EMOTIONS)) % len(SENTIMENTS)]}
+
+
+# Behaviour and counters of the mock server
+class MockOpenAI:
+    """
+    Decides the outcome of every request and keeps the statistics.
+    Shared by all handler threads, so all counters are updated under a lock.
+
+    """
+
+    def __init__(self, latency=DEFAULT_LATENCY, error_429=0.0, error_500=0.0, rpm=None, seed=42):
+        self.draw_latency = parse_latency(latency)
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.rpm = rpm
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.status = Counter()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.window = []   # request times of the last minute (for rpm throttling)
+
+    # Outcome and delay of one request
+    def plan(self):
+        with self.lock:
+            delay = self.draw_latency(self.rng)
+            roll = self.rng.random()
+
+            now = time.monotonic()
+            if self.rpm:
+                self.window = [t for t in self.window if now - t < 60.0]
+                if len(self.window) >= self.rpm:
+                    return 429, 0.0
+                self.window.append(now)
+
+            if roll < self.error_429:
+                return 429, 0.0
+            if roll < self.error_429 + self.error_500:
+                return 500, delay
+            return 200, delay
+
+    def record(self, status, prompt_tokens=0, completion_tokens=0):
+        with self.lock:
+            self.status[status] += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": sum(self.status.values()),
+                "status": {str(k): v for k, v in sorted(self.status.items())},
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+            }
+
+    def reset(self):
+        with self.lock:
+            self.status.clear()
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+
+# Build a chat.completion response body
+def completion_body(request, annotation):
+    content = json.dumps(annotation)
+    prompt_tokens = sum(estimate_tokens(m.get("content", "")) + 4 for m in request.get("messages", []))
+    completion_tokens = estimate_tokens(content)
+    return {
+        "id": f"chatcmpl-mock-{zlib.crc32(content.encode('utf-8')):08x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+# HTTP handler bound to one MockOpenAI instance
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message, error_type, headers=None):
+            self._send_json(status, {"error": {"message": message, "type": error_type}}, headers)
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                self._error(404, "unknown endpoint", "invalid_request_error")
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length))
+            except json.JSONDecodeError:
+                mock.record(400)
+                self._error(400, "invalid JSON body", "invalid_request_error")
+                return
+
+            status, delay = mock.plan()
+            time.sleep(delay)
+
+            if status == 429:
+                mock.record(429)
+                self._error(429, "Rate limit reached (mock)", "rate_limit_exceeded",
+                            {"retry-after-ms": str(RETRY_AFTER_MS)})
+            elif status == 500:
+                mock.record(500)
+                self._error(500, "The server had an error (mock)", "server_error")
+            else:
+                user_text = next((m.get("content", "") for m in reversed(request.get("messages", []))
+                                  if m.get("role") == "user"), "")
+                body = completion_body(request, mock_annotation(user_text))
+                mock.record(200, body["usage"]["prompt_tokens"], body["usage"]["completion_tokens"])
+                self._send_json(200, body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, mock.stats())
+            else:
+                self._error(404, "unknown endpoint", "invalid_request_error")
+
+        def do_DELETE(self):
+            if self.path == "/stats":
+                mock.reset()
+                self._send_json(200, mock.stats())
+            else:
+                self._error(404, "unknown endpoint", "invalid_request_error")
+
+        def log_message(self, format, *args):
+            # Per-request logging to stderr would dominate the latency
+            pass
+
+    return Handler
+
+
+# Start the server in a background thread (used by the load test)
+def start_background(mock, host=HOST, port=0):
+    """
+    Start a mock server in a daemon thread.
+
+    Args:
+        mock (MockOpenAI): Behaviour of the server.
+        host (str): Interface to bind to.
+        port (int): Port (0 = pick a free one).
+    Returns:
+        tuple: (server, base_url), base_url ends with /v1 like the real API.
+
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python part2_mock_openai.py [--port N] [--latency SPEC] [--error-429 P] [--error-500 P] [--rpm N]
+    Returns port and the MockOpenAI options.
+
+    """
+    args = sys.argv[1:]
+    options = {"--port": str(PORT), "--latency": DEFAULT_LATENCY,
+               "--error-429": "0", "--error-500": "0", "--rpm": None}
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1] if i + 1 < len(args) else ""
+            del args[i:i + 2]
+
+    try:
+        parse_latency(options["--latency"])
+        port = int(options["--port"])
+        kwargs = {
+            "latency": options["--latency"],
+            "error_429": float(options["--error-429"]),
+            "error_500": float(options["--error-500"]),
+            "rpm": int(options["--rpm"]) if options["--rpm"] else None,
+        }
+    except ValueError:
+        args.append("invalid")
+
+    if args:
+        print("Error: Missing or invalid arguments\n")
+        print("Usage: python part2_mock_openai.py [--port N] "
+              "[--latency fixed:S|uniform:LOW:HIGH|lognormal:MEDIAN:SIGMA] "
+              "[--error-429 P] [--error-500 P] [--rpm N]\n")
+        print("Example:")
+        print("  python part2_mock_openai.py --latency lognormal:0.6:0.5 --error-429 0.05 --rpm 500")
+        sys.exit(1)
+
+    return port, kwargs
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    port, kwargs = system_setup()
+    mock = MockOpenAI(**kwargs)
+    server = ThreadingHTTPServer((HOST, port), make_handler(mock))
+
+    print(f"Mock OpenAI API on http://{HOST}:{port}/v1 (latency {kwargs['latency']}, "
+          f"429: {kwargs['error_429']:.0%}, 500: {kwargs['error_500']:.0%}, rpm: {kwargs['rpm']})")
+    print(f"Use it with: OPENAI_BASE_URL=http://{HOST}:{port}/v1 OPENAI_API_KEY=mock")
+    try:
+        with profile_stage("mock_openai"):
+            server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        print(json.dumps(mock.stats(), indent=2))
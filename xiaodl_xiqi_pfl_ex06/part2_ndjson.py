@@ -0,0 +1,209 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2 (extension):
+NDJSON streaming format for sentence files
+
+- Writes sentence records as NDJSON (one JSON object per line).
+- Reads NDJSON lazily with a generator that can filter by speaker and act while streaming.
+- Also streams the existing pretty-printed array files (all_sentences_<play>.json,
+  selected_speakers_<play>.json) record by record, without json.load of the whole file.
+- Converts array-style files to NDJSON from the command line.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import os
+import sys
+import json
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+CHUNK_SIZE = 64 * 1024  # characters read at a time from array-style files
+
+_decoder = json.JSONDecoder()
+
+
+# Detect the file format from its first non-whitespace character
+def is_ndjson(path):
+    """
+    Check whether a file is NDJSON ("{" first) rather than a JSON array ("[" first).
+
+    Args:
+        path (str): Path to the sentence file.
+    Returns:
+        bool: True for NDJSON files.
+
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            char = f.read(1)
+            if not char:
+                return False
+            if not char.isspace():
+                return char == "{"
+
+
+# Keep a record if it matches the speaker / act filters
+def _matches(record, speakers, acts):
+    if speakers is not None and record["speaker"] not in speakers:
+        return False
+    if acts is not None and record["act"] not in acts:
+        return False
+    return True
+
+
+# Lazy NDJSON reader
+def iter_ndjson(path, speakers=None, acts=None):
+    """
+    Yield sentence records from an NDJSON file one at a time.
+
+    Args:
+        path (str): Path to the NDJSON file.
+        speakers (set of str): Only yield these speakers (None = all).
+        acts (set of str): Only yield these acts (None = all).
+    Yields:
+        dict: One sentence record.
+
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if _matches(record, speakers, acts):
+                yield record
+
+
+# Lazy reader for the existing array-style JSON files
+def iter_json_array(path, speakers=None, acts=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the objects of a top-level JSON array one at a time,
+    reading the file in chunks so memory stays bounded by the largest record.
+
+    Args:
+        path (str): Path to the JSON array file.
+        speakers (set of str): Only yield these speakers (None = all).
+        acts (set of str): Only yield these acts (None = all).
+        chunk_size (int): Number of characters read per chunk.
+    Yields:
+        dict: One sentence record.
+
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        started = False
+        eof = False
+
+        while True:
+            # Skip whitespace and the array punctuation between records
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in ",["):
+                if buffer[pos] == "[":
+                    started = True
+                pos += 1
+
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+
+            if pos < len(buffer) and started:
+                try:
+                    record, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    pos = end
+                    if _matches(record, speakers, acts):
+                        yield record
+                    continue
+
+            if eof:
+                if started:
+                    raise ValueError(f"{path}: unexpected end of JSON array")
+                return
+
+            # Need more data: drop what was consumed and read the next chunk
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+# Format-independent lazy reader
+def iter_sentences(path, speakers=None, acts=None):
+    """
+    Yield sentence records from either an NDJSON or a JSON array file.
+
+    Args:
+        path (str): Path to the sentence file.
+        speakers (iterable of str): Only yield these speakers (None = all).
+        acts (iterable of str): Only yield these acts (None = all).
+    Yields:
+        dict: One sentence record.
+
+    """
+    speakers = set(speakers) if speakers is not None else None
+    acts = set(acts) if acts is not None else None
+
+    if is_ndjson(path):
+        yield from iter_ndjson(path, speakers, acts)
+    else:
+        yield from iter_json_array(path, speakers, acts)
+
+
+# Write records as NDJSON
+def write_ndjson(records, path):
+    """
+    Write sentence records to an NDJSON file, one record per line.
+    Records may come from a generator, so nothing has to be held in memory.
+
+    Args:
+        records (iterable of dict): Sentence records.
+        path (str): Path of the NDJSON file.
+    Returns:
+        int: Number of records written.
+
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+# Convert an array-style JSON file to NDJSON
+def convert_to_ndjson(json_path, ndjson_path=None):
+    """
+    Stream an array-style sentence file into an NDJSON file.
+
+    Args:
+        json_path (str): Path to the JSON array file.
+        ndjson_path (str): Output path (default: same name with .ndjson).
+    Returns:
+        tuple: (ndjson_path, number of records).
+
+    """
+    if ndjson_path is None:
+        ndjson_path = os.path.splitext(json_path)[0] + ".ndjson"
+    count = write_ndjson(iter_sentences(json_path), ndjson_path)
+    return ndjson_path, count
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    if len(sys.argv) < 2:
+        print("Error: Missing required arguments\n")
+        print("Usage: python part2_ndjson.py <json_file> [<json_file> ...]\n")
+        print("Example:")
+        print("  python part2_ndjson.py all_sentences_hamlet.json selected_speakers_hamlet.json")
+        sys.exit(1)
+
+    with profile_stage("ndjson_convert"):
+        for json_path in sys.argv[1:]:
+            if is_ndjson(json_path):
+                print(f"{json_path} is already NDJSON, skipping.")
+                continue
+            ndjson_path, count = convert_to_ndjson(json_path)
+            print(f"Converted {count} records: {json_path} -> {ndjson_path}")
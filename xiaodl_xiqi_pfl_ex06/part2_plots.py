@@ -15,9 +15,12 @@ Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
 Author 2 & Matriculation Number: Qi Xinyan 23-757-511
 """
 
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 from collections import defaultdict, Counter
+from pipeline_profiling import pop_profile_flags, profile_stage
 
 # All the following graphs are based on GPT and Flair sentiment analysis results.
 # We consider to also include manual sentiment analysis results but decide not to do so
@@ -50,6 +53,14 @@ POS_COLOR = "#4CAF50"   # green
 NEG_COLOR = "#F44336"   # red
 NEU_COLOR = "#2196F3"   # blue
 
+# GPT sentiment labels encoded as sentiment direction
+SENTIMENT_VALUES = {"positive": 1, "neutral": 0, "negative": -1}
+
+# Batch rendering of speaker trends: reduced DPI and the supported output formats
+TREND_DPI = 100
+TREND_FORMATS = ["png", "svg", "webp"]
+TREND_DIR = "speaker_trends"
+
 # Read and preprocess data
 def read_data(filepath):
     """
@@ -301,9 +312,9 @@ def plot_character_comparison(df):
     
     """
     df = df.copy()
-    df["sentiment_value"] = df["gpt_sentiment"].map(
-        {"positive": 1, "neutral": 0, "negative": -1}
-    )
+    df["sentiment_value"] = df["gpt_sentiment"].map(SENTIMENT_VALUES)
+    # Rows routed to Flair (see part2_routing.py) have no GPT sentiment
+    df = df.dropna(subset=["sentiment_value"])
 
     hamlet = df[df["speaker"] == "HAMLET"]
     claudius = df[df["speaker"] == "KING CLAUDIUS"]
@@ -319,23 +330,45 @@ def plot_character_comparison(df):
     return fig
 
 
-# 4. Sentiment development for Hamlet
-def plot_hamlet_trend(df):
+# Shared helper for the single-speaker sentiment development plots
+def plot_speaker_trend(df, speaker, name):
+    """
+    Plots sentiment development for one speaker using GPT sentiment analysis.
+    Args:
+        df (pd.DataFrame): DataFrame containing the sentiment data.
+        speaker (str): Speaker as written in the data, e.g. "KING CLAUDIUS".
+        name (str): Name used in the title, e.g. "King Claudius".
+    Returns:
+        fig (matplotlib.figure.Figure): The generated plot figure.
+
+    """
     df = df.copy()
-    df["sentiment_value"] = df["gpt_sentiment"].map(
-        {"positive": 1, "neutral": 0, "negative": -1}
-    )
+    df["sentiment_value"] = df["gpt_sentiment"].map(SENTIMENT_VALUES)
+    df = df.dropna(subset=["sentiment_value"])
 
-    hamlet = df[df["speaker"] == "HAMLET"]
+    rows = df[df["speaker"] == speaker]
 
     fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(hamlet["sentence number"], hamlet["sentiment_value"])
-    ax.set_title("Sentiment Development: Hamlet")
+    ax.plot(rows["sentence number"], rows["sentiment_value"])
+    ax.set_title(f"Sentiment Development: {name}")
     ax.set_xlabel("Sentence Number")
     ax.set_ylabel("Sentiment Value")
     return fig
 
 
+# 4. Sentiment development for Hamlet
+def plot_hamlet_trend(df):
+    """
+    Plots sentiment development for Hamlet using GPT sentiment analysis.
+    Args:
+        df (pd.DataFrame): DataFrame containing the sentiment data.
+    Returns:
+        fig (matplotlib.figure.Figure): The generated plot figure.
+
+    """
+    return plot_speaker_trend(df, "HAMLET", "Hamlet")
+
+
 # 5. Sentiment development for King Claudius
 def plot_claudius_trend(df):
     """
@@ -346,40 +379,109 @@ def plot_claudius_trend(df):
         fig (matplotlib.figure.Figure): The generated plot figure.
     
     """
-    df = df.copy()
-    df["sentiment_value"] = df["gpt_sentiment"].map(
-        {"positive": 1, "neutral": 0, "negative": -1}
-    )
+    return plot_speaker_trend(df, "KING CLAUDIUS", "King Claudius")
 
-    claudius = df[df["speaker"] == "KING CLAUDIUS"]
 
+# Batch rendering of sentiment development for many speakers
+def render_speaker_trends(df, speakers=None, out_dir=TREND_DIR, fmt="png", dpi=TREND_DPI):
+    """
+    Renders the sentiment development of every speaker from one figure template.
+
+    The figure, axes, labels and line are built once; for each speaker only the
+    line data, title and x-limits are updated before saving. Rendering N speakers
+    therefore costs about N saves instead of N figure constructions.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing the sentiment data.
+        speakers (list of str): Speakers to render (None = every speaker in df).
+            Speakers without GPT-labelled rows are skipped with a message.
+        out_dir (str): Output directory (a separate one by default, so the
+            committed 300 DPI Plot 4 in the working directory is not overwritten).
+        fmt (str): Output format, one of "png", "svg" or "webp".
+        dpi (int): Resolution for raster formats.
+    Returns:
+        list of str: Paths of the saved files.
+
+    """
+    if fmt not in TREND_FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {TREND_FORMATS}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    df = df.copy()
+    df["sentiment_value"] = df["gpt_sentiment"].map(SENTIMENT_VALUES)
+    df = df.dropna(subset=["sentiment_value"])
+    groups = df.groupby("speaker", sort=False)
+    if speakers is None:
+        speakers = list(groups.groups)
+
+    # Figure template: everything that is the same for all speakers
     fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(claudius["sentence number"], claudius["sentiment_value"])
-    ax.set_title("Sentiment Development: King Claudius")
+    (line,) = ax.plot([], [])
     ax.set_xlabel("Sentence Number")
     ax.set_ylabel("Sentiment Value")
-    return fig
-
-
-if __name__ == "__main__":
-    print("Starting Plot Creation...\n")
+    ax.set_ylim(-1.1, 1.1)
+    ax.set_yticks([-1, 0, 1])
+    # Placeholder title, so tight_layout() leaves room for the real titles
+    ax.set_title("Sentiment Development")
+    fig.tight_layout()
+
+    paths = []
+    for speaker in speakers:
+        if speaker not in groups.groups:
+            print(f"Skipping {speaker}: no rows with GPT sentiment")
+            continue
+        rows = groups.get_group(speaker)
+        x = rows["sentence number"].to_numpy()
+        line.set_data(x, rows["sentiment_value"].to_numpy())
+        ax.set_xlim(x.min() - 1, x.max() + 1)
+        ax.set_title(f"Sentiment Development: {speaker.title()}")
 
-    filepath = "sentiment_analysis_hamlet.xlsx"
-    df = read_data(filepath)
+        slug = "_".join(speaker.lower().split())
+        path = os.path.join(out_dir, f"play_{slug}_sentiment_development.{fmt}")
+        fig.savefig(path, format=fmt, dpi=dpi)
+        paths.append(path)
 
-    print("Creating Plot 1...")
-    save_plot(plot_sentiment_per_act(df), "plot_1.png")
+    plt.close(fig)
+    return paths
 
-    print("Creating Plot 2...")
-    save_plot(plot_sentiment_per_scene(df), "plot_2.png")
 
-    print("Creating Plot 3...")
-    save_plot(plot_character_comparison(df), "plot_3.png")
+if __name__ == "__main__":
+    print("Starting Plot Creation...\n")
 
-    print("Creating Plot 4...")
-    save_plot(plot_hamlet_trend(df), "play_hamlet_sentiment_development.png")
+    pop_profile_flags()
 
-    print("Creating Plot 5...")
-    save_plot(plot_claudius_trend(df), "play_claudius_sentiment_development.png")
+    filepath = "sentiment_analysis_hamlet.xlsx"
+    with profile_stage("read_data"):
+        df = read_data(filepath)
+
+    # Rows routed to Flair (see part2_routing.py) are missing from the GPT plots
+    unlabelled = int(df["gpt_sentiment"].isna().sum())
+    print(f"{unlabelled} rows without GPT sentiment are left out of the GPT plots")
+
+    with profile_stage("create_plots"):
+        print("Creating Plot 1...")
+        save_plot(plot_sentiment_per_act(df), "plot_1.png")
+
+        print("Creating Plot 2...")
+        save_plot(plot_sentiment_per_scene(df), "plot_2.png")
+
+        print("Creating Plot 3...")
+        save_plot(plot_character_comparison(df), "plot_3.png")
+
+        print("Creating Plot 4...")
+        save_plot(plot_hamlet_trend(df), "play_hamlet_sentiment_development.png")
+
+        print("Creating Plot 5...")
+        save_plot(plot_claudius_trend(df), "play_claudius_sentiment_development.png")
+
+        # Optional: sentiment development of every speaker, e.g.
+        # python part2_plots.py --all-speakers speaker_trends webp
+        if "--all-speakers" in sys.argv:
+            i = sys.argv.index("--all-speakers")
+            out_dir = sys.argv[i + 1] if len(sys.argv) > i + 1 else TREND_DIR
+            fmt = sys.argv[i + 2] if len(sys.argv) > i + 2 else "png"
+            print(f"Creating speaker trends ({fmt})...")
+            paths = render_speaker_trends(df, out_dir=out_dir, fmt=fmt)
+            print(f"Saved {len(paths)} speaker trends to {out_dir}")
 
     print("Plot Creation Completed.")
\ No newline at end of file
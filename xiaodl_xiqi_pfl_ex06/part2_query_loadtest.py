@@ -0,0 +1,119 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2 (extension):
+Load test for the local query service
+
+- Asks the running part2_query_service.py for the available plays.
+- Sends a mix of aggregate queries (by play, speaker, act and scene) from several threads.
+- Reports requests per second and p50 / p99 latency.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import sys
+import json
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import urlopen
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+N_REQUESTS = 5000
+CONCURRENCY = 8
+
+
+# Build a random mix of query URLs
+def build_queries(base_url, plays, n_requests, seed=42):
+    """
+    Build n_requests query URLs: per play totals, per speaker / act / scene
+    breakdowns and single-speaker breakdowns.
+
+    Args:
+        base_url (str): e.g. "http://127.0.0.1:8765".
+        plays (list of str): Plays known to the service.
+        n_requests (int): Number of URLs.
+        seed (int): Random seed.
+    Returns:
+        list of str: Query URLs.
+
+    """
+    rng = random.Random(seed)
+    templates = []
+    for play in plays:
+        templates.append({"play": play})
+        templates.append({"play": play, "by": "speaker"})
+        templates.append({"play": play, "by": "act"})
+        templates.append({"play": play, "by": "scene"})
+
+        speakers = json.load(urlopen(f"{base_url}/aggregate?play={play}&by=speaker"))["result"]
+        for speaker in speakers:
+            templates.append({"play": play, "speaker": speaker, "by": "scene"})
+            templates.append({"play": play, "speaker": speaker, "act": "ACT III"})
+
+    return [f"{base_url}/aggregate?{urlencode(rng.choice(templates))}" for _ in range(n_requests)]
+
+
+# Time one request
+def timed_request(url):
+    start = time.perf_counter()
+    with urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+# Run the load test
+def run_load_test(base_url, n_requests=N_REQUESTS, concurrency=CONCURRENCY):
+    """
+    Send the query mix with the given concurrency and measure latency.
+
+    Returns:
+        dict: requests, seconds, requests_per_second, p50_ms, p99_ms.
+
+    """
+    plays = json.load(urlopen(f"{base_url}/plays"))["plays"]
+    urls = build_queries(base_url, plays, n_requests)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed_request, urls))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(urls),
+        "seconds": elapsed,
+        "requests_per_second": len(urls) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    if len(sys.argv) not in (2, 3, 4):
+        print("Error: Missing required arguments\n")
+        print("Usage: python part2_query_loadtest.py <base_url> [n_requests] [concurrency]\n")
+        print("Example:")
+        print("  python part2_query_loadtest.py http://127.0.0.1:8765 5000 8")
+        sys.exit(1)
+
+    base_url = sys.argv[1].rstrip("/")
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else N_REQUESTS
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else CONCURRENCY
+
+    with profile_stage("query_loadtest"):
+        report = run_load_test(base_url, n_requests, concurrency)
+
+    print(f"Requests:        {report['requests']}")
+    print(f"Wall time:       {report['seconds']:.2f} s")
+    print(f"Requests/sec:    {report['requests_per_second']:.0f}")
+    print(f"Latency p50:     {report['p50_ms']:.2f} ms")
+    print(f"Latency p99:     {report['p99_ms']:.2f} ms")
+
+    stats = json.load(urlopen(f"{base_url}/stats"))
+    print(f"Cache hits:      {stats['cache_hits']} / misses: {stats['cache_misses']}")
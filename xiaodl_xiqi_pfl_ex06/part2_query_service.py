@@ -0,0 +1,262 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2 (extension):
+Local query service over pre-aggregated corpus sentiment
+
+- Loads the aggregate store written by part2_incremental_stats.py once at startup
+  and indexes its cells by play, speaker, act and scene ("ACT x / SCENE y",
+  because scene numbers restart in every act).
+- Answers sentiment / emotion aggregate queries over HTTP (standard library only), e.g.
+  GET /aggregate?play=othello&speaker=OTHELLO&by=scene
+- Results are kept in an LRU cache, so repeated queries are answered from memory.
+- Endpoints: /plays, /aggregate, /stats
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import re
+import sys
+import json
+from collections import defaultdict
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from part2_incremental_stats import load_aggregates, iter_cells, SENTIMENTS
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+HOST = "127.0.0.1"
+PORT = 8765
+CACHE_SIZE = 4096
+DIMENSIONS = ["play", "speaker", "act", "scene"]
+
+ACT_RE = re.compile(r"ACT\s+[IVXLC]+")
+SCENE_RE = re.compile(r"SCENE\s+[IVXLC]+")
+
+
+# Scene label with its act, since scene numbers restart in every act:
+# ("ACT I", "SCENE II. A room of state in the castle.") -> "ACT I / SCENE II"
+def normalize_scene(act, scene):
+    act_match = ACT_RE.search(str(act).upper())
+    scene_match = SCENE_RE.search(str(scene).upper())
+    act = act_match.group(0) if act_match else str(act).upper().strip()
+    scene = scene_match.group(0) if scene_match else str(scene).upper().strip()
+    return f"{act} / {scene}"
+
+
+# Index of all aggregate cells
+class AggregateIndex:
+    """
+    In-memory index over the aggregate cells.
+
+    Every cell gets an id; for each dimension value (e.g. speaker "HAMLET")
+    the index stores the set of cell ids, so a query only intersects small sets
+    and sums the matching cells.
+
+    """
+
+    def __init__(self, aggregates):
+        self.cells = []
+        self.keys = []
+        self.postings = {dimension: defaultdict(set) for dimension in DIMENSIONS}
+
+        for play, speaker, act, scene, cell in iter_cells(aggregates):
+            key = {
+                "play": play.lower(),
+                "speaker": speaker.upper(),
+                "act": act.upper(),
+                "scene": normalize_scene(act, scene),
+            }
+            cell_id = len(self.cells)
+            self.cells.append(cell)
+            self.keys.append(key)
+            for dimension, value in key.items():
+                self.postings[dimension][value].add(cell_id)
+
+    def plays(self):
+        return sorted(self.postings["play"])
+
+    def match(self, filters):
+        """
+        Return the ids of all cells matching the filters (dimension -> value).
+
+        """
+        ids = None
+        for dimension, value in filters.items():
+            found = self.postings[dimension].get(value, set())
+            ids = set(found) if ids is None else ids & found
+        return range(len(self.cells)) if ids is None else sorted(ids)
+
+
+# Sum a list of cells into one result
+def summarize(cells):
+    rows = sum(c["rows"] for c in cells)
+    labelled = sum(c[s] for c in cells for s in SENTIMENTS)
+    flair_count = sum(c["flair_count"] for c in cells)
+
+    emotions = defaultdict(int)
+    for c in cells:
+        for emotion, count in c.get("emotions", {}).items():
+            emotions[emotion] += count
+
+    result = {"rows": rows}
+    for sentiment in SENTIMENTS:
+        count = sum(c[sentiment] for c in cells)
+        result[sentiment] = count
+        result[f"{sentiment}_share"] = count / labelled if labelled else None
+    result["mean_intensity"] = (
+        sum(c["flair_abs_sum"] for c in cells) / flair_count if flair_count else None
+    )
+    result["high_emotion"] = sum(c["high_emotion"] for c in cells)
+    result["emotions"] = dict(sorted(emotions.items(), key=lambda e: -e[1]))
+    return result
+
+
+# The service: index + cached query function
+class QueryService:
+    """
+    Answers aggregate queries against an AggregateIndex with an LRU result cache.
+
+    """
+
+    def __init__(self, aggregates, cache_size=CACHE_SIZE):
+        self.index = AggregateIndex(aggregates)
+        # Cache per instance; the query arguments are hashable tuples
+        self.query = lru_cache(maxsize=cache_size)(self._query)
+
+    def _query(self, filters, by):
+        """
+        Aggregate all cells matching the filters, optionally grouped by one dimension.
+
+        Args:
+            filters (tuple): Sorted (dimension, value) pairs.
+            by (str): Dimension to group by, or None for a single total.
+        Returns:
+            dict: The aggregate (or one aggregate per group).
+
+        """
+        ids = self.index.match(dict(filters))
+        if by is None:
+            return summarize([self.index.cells[i] for i in ids])
+
+        groups = defaultdict(list)
+        for i in ids:
+            groups[self.index.keys[i][by]].append(self.index.cells[i])
+        return {group: summarize(cells) for group, cells in groups.items()}
+
+
+# Turn query string parameters into a cache-friendly query
+def parse_query(params):
+    """
+    Read filters and the group-by dimension from the query string.
+
+    A scene is only unique within its act, so scene= needs act= as well
+    (scene=SCENE II&act=ACT III) or has to name it (scene=ACT III / SCENE II).
+
+    Args:
+        params (dict): Result of urllib.parse.parse_qs().
+    Returns:
+        tuple: (filters, by) where filters is a sorted tuple of (dimension, value).
+
+    """
+    filters = {}
+    for dimension in DIMENSIONS:
+        if dimension in params:
+            value = params[dimension][0]
+            if dimension == "play":
+                value = value.lower()
+            elif dimension == "scene":
+                act = ACT_RE.search(value.upper())
+                if act is None and "act" in params:
+                    act = ACT_RE.search(params["act"][0].upper())
+                if act is None:
+                    raise ValueError("'scene' needs 'act' (or a value like 'ACT III / SCENE II')")
+                value = normalize_scene(act.group(0), value)
+            else:
+                value = value.upper()
+            filters[dimension] = value
+
+    by = params.get("by", [None])[0]
+    if by is not None and by not in DIMENSIONS:
+        raise ValueError(f"'by' must be one of {DIMENSIONS}")
+    return tuple(sorted(filters.items())), by
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/plays":
+                self._send_json(200, {"plays": service.index.plays()})
+            elif url.path == "/aggregate":
+                try:
+                    filters, by = parse_query(parse_qs(url.query))
+                except ValueError as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+                self._send_json(200, {
+                    "filters": dict(filters),
+                    "by": by,
+                    "result": service.query(filters, by),
+                })
+            elif url.path == "/stats":
+                info = service.query.cache_info()
+                self._send_json(200, {
+                    "cells": len(service.index.cells),
+                    "cache_hits": info.hits,
+                    "cache_misses": info.misses,
+                    "cache_size": info.currsize,
+                })
+            else:
+                self._send_json(404, {"error": "unknown endpoint"})
+
+        def log_message(self, format, *args):
+            # Per-request logging to stderr would dominate the latency
+            pass
+
+    return Handler
+
+
+# Start the HTTP server
+def serve(aggregates_path, host=HOST, port=PORT):
+    """
+    Load the aggregate store once and serve queries until interrupted.
+
+    Args:
+        aggregates_path (str): Aggregate store written by part2_incremental_stats.py.
+        host (str): Interface to bind to.
+        port (int): Port to listen on.
+
+    """
+    service = QueryService(load_aggregates(aggregates_path))
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+
+    print(f"Loaded {len(service.index.cells)} cells for plays: {', '.join(service.index.plays())}")
+    print(f"Serving on http://{host}:{port}/aggregate?play=...&speaker=...&act=...&scene=...&by=...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    if len(sys.argv) not in (2, 3):
+        print("Error: Missing required arguments\n")
+        print("Usage: python part2_query_service.py <aggregates_json> [port]\n")
+        print("Example:")
+        print("  python part2_query_service.py sentiment_aggregates.json 8765")
+        sys.exit(1)
+
+    with profile_stage("query_service"):
+        serve(sys.argv[1], port=int(sys.argv[2]) if len(sys.argv) == 3 else PORT)
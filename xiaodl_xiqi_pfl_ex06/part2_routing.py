@@ -0,0 +1,197 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2a (extension):
+Confidence-based routing of sentences to GPT
+
+- Decides per sentence whether a GPT call is needed:
+    - "cache": the same (normalised) line was already annotated by GPT
+    - "flair": Flair is very confident and the line is long enough, so no GPT call
+      is made; the row keeps its flair_label and the gpt_* columns stay empty
+    - "gpt":   everything else is sent to analyze_with_gpt()
+- Keeps a JSON cache of GPT results keyed by normalised text.
+- Reports, on a held-out sample of an existing annotation Excel file, the fraction
+  of calls avoided, the share of lines left without a GPT label (routed to Flair)
+  and the share of cached labels that differ from a fresh GPT call.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import os
+import re
+import sys
+import json
+import pandas as pd
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+CACHE_PATH = "gpt_cache.json"
+
+# Default routing policy
+ROUTING_POLICY = {
+    "flair_min_score": 0.999,  # Flair confidence band that is trusted without GPT
+    "min_tokens": 6,           # shorter lines are ambiguous and always go to GPT
+    "use_cache": True,         # reuse GPT results of identical lines
+}
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+# Normalise a line for cache lookups
+def normalize_text(text):
+    return " ".join(TOKEN_RE.findall(str(text).lower()))
+
+
+# Load / save the GPT result cache
+def load_cache(path=CACHE_PATH):
+    """
+    Load the GPT result cache (normalised text -> {"main_emotion", "sentiment"}).
+
+    Args:
+        path (str): Path to the cache JSON file.
+    Returns:
+        dict: The cache, empty if the file does not exist.
+
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_cache(cache, path=CACHE_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+
+
+# Decide where the annotation of one sentence comes from
+def route_sentence(text, flair_label, flair_score, cache, policy=ROUTING_POLICY):
+    """
+    Decide whether a sentence needs a GPT call.
+
+    Args:
+        text (str): The sentence.
+        flair_label (str): "POSITIVE" or "NEGATIVE".
+        flair_score (float): Flair confidence.
+        cache (dict): GPT result cache.
+        policy (dict): Routing policy, see ROUTING_POLICY.
+    Returns:
+        tuple: (source, result) where source is "cache", "flair" or "gpt" and
+        result is the cached GPT annotation, an empty annotation for "flair"
+        (Flair output is never written as GPT output) or None for "gpt".
+
+    """
+    key = normalize_text(text)
+    if policy["use_cache"] and key in cache:
+        return "cache", cache[key]
+
+    n_tokens = len(key.split())
+    if flair_score >= policy["flair_min_score"] and n_tokens >= policy["min_tokens"]:
+        # Downstream code reads gpt_* as GPT output, so nothing is filled in here
+        return "flair", {"main_emotion": None, "sentiment": None}
+
+    return "gpt", None
+
+
+# Annotate one sentence, calling GPT only when the policy says so
+def annotate_sentence(item, client, cache, policy, analyze):
+    """
+    Route one sentence and annotate it with the chosen source.
+
+    Args:
+        item (dict): Sentence with "text" and Flair "sentiment".
+        client: OpenAI client passed on to analyze().
+        cache (dict): GPT result cache, updated with new GPT results.
+        policy (dict): Routing policy.
+        analyze (callable): analyze_with_gpt(text, client).
+    Returns:
+        tuple: (source, result)
+
+    """
+    source, result = route_sentence(
+        item["text"], item["sentiment"]["label"], item["sentiment"]["score"], cache, policy
+    )
+    if source == "gpt":
+        result = analyze(item["text"], client)
+        if result.get("sentiment") is not None:
+            cache[normalize_text(item["text"])] = result
+    return source, result
+
+
+def summarize_sources(sources):
+    """
+    Count the sources and the share of GPT calls avoided.
+
+    Args:
+        sources (list of str): Source per sentence.
+    Returns:
+        dict: Count per source and "avoided" share.
+
+    """
+    counts = {s: sources.count(s) for s in ("gpt", "flair", "cache")}
+    counts["avoided"] = 1 - counts["gpt"] / len(sources) if sources else 0.0
+    return counts
+
+
+# What would the policy have cost on already annotated data?
+def evaluate_policy(df, policy=ROUTING_POLICY, holdout_share=0.3, seed=42):
+    """
+    Replay the policy on a held-out sample of an annotation table that already
+    has GPT labels, without any API call. The cache starts empty and is filled
+    as the replay goes, like in a real run.
+
+    The cost is measured on what process_file(..., routing=True) actually writes:
+    lines routed to Flair get no GPT label at all ("unlabelled"), and lines filled
+    from the cache get a GPT label that may differ from a fresh call ("label_changes").
+
+    Args:
+        df (pd.DataFrame): Rows with text, flair_label, flair_score, gpt_sentiment.
+        policy (dict): Routing policy.
+        holdout_share (float): Share of rows used for the replay.
+        seed (int): Random seed.
+    Returns:
+        dict: Calls avoided, share of unlabelled lines and share of changed labels.
+
+    """
+    sample = df.sample(frac=holdout_share, random_state=seed)
+    cache = {}
+    sources = []
+    cache_changes = 0
+
+    for _, row in sample.iterrows():
+        source, result = route_sentence(
+            row["text"], row["flair_label"], row["flair_score"], cache, policy
+        )
+        sources.append(source)
+        if source == "gpt":
+            cache[normalize_text(row["text"])] = {
+                "main_emotion": row["gpt_main_emotion"], "sentiment": row["gpt_sentiment"]
+            }
+        elif source == "cache":
+            cache_changes += result["sentiment"] != row["gpt_sentiment"]
+
+    report = summarize_sources(sources)
+    n = len(sample)
+    report["sample"] = n
+    report["unlabelled"] = report["flair"] / n if n else 0.0
+    report["label_changes"] = cache_changes / n if n else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    if len(sys.argv) not in (2, 3):
+        print("Error: Missing required arguments\n")
+        print("Usage: python part2_routing.py <excel_file> [holdout_share]\n")
+        print("Example:")
+        print("  python part2_routing.py sentiment_analysis_hamlet.xlsx 0.3")
+        sys.exit(1)
+
+    with profile_stage("routing_evaluation"):
+        df = pd.read_excel(sys.argv[1])
+        holdout_share = float(sys.argv[2]) if len(sys.argv) == 3 else 0.3
+
+        print(f"{'flair_min_score':>16} {'avoided':>9} {'unlabelled':>11} {'changed':>9}")
+        for band in (0.95, 0.98, 0.99, 0.995, 0.999, 1.01):
+            policy = dict(ROUTING_POLICY, flair_min_score=band)
+            report = evaluate_policy(df, policy, holdout_share)
+            print(f"{band:>16} {report['avoided']:>9.1%} "
+                  f"{report['unlabelled']:>11.1%} {report['label_changes']:>9.1%}")
@@ -0,0 +1,395 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2 (extension):
+Compact in-memory sentence store
+
+- Stores sentences column by column (struct-of-arrays) instead of a list of dicts.
+- Act, scene, speaker and Flair label strings are interned once and stored as small integer codes.
+- Sentence numbers, codes and Flair scores live in NumPy arrays, the texts in one UTF-8 buffer.
+- Rows are exposed through light __slots__ views and can be turned back into the usual dicts.
+- Grouping by speaker (or act) only builds index arrays, no sentence is copied.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+from collections.abc import Sequence
+import numpy as np
+
+NO_LABEL = -1  # label code of sentences without Flair sentiment
+INITIAL_CAPACITY = 1024
+
+
+# Interned strings <-> integer codes
+class Vocabulary:
+    """
+    Two-way mapping between repeated strings (e.g. "KING CLAUDIUS") and integer codes.
+
+    """
+    __slots__ = ("strings", "codes")
+
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.codes[value] = code
+            self.strings.append(value)
+        return code
+
+    def decode(self, code):
+        return self.strings[code]
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __contains__(self, value):
+        return value in self.codes
+
+
+# Dictionary keys of a sentence -> SentenceRow attributes
+_ROW_KEYS = {
+    "act": "act",
+    "scene": "scene",
+    "speaker": "speaker",
+    "sentence number": "sentence_number",
+    "text": "text",
+    "sentiment": "sentiment",
+}
+
+
+# One sentence of the table
+class SentenceRow:
+    """
+    Read-only view of one sentence; holds only the table and the row index.
+
+    """
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def act(self):
+        return self.table.acts.decode(self.table.act_codes[self.index])
+
+    @property
+    def scene(self):
+        return self.table.scenes.decode(self.table.scene_codes[self.index])
+
+    @property
+    def speaker(self):
+        return self.table.speakers.decode(self.table.speaker_codes[self.index])
+
+    @property
+    def sentence_number(self):
+        return int(self.table.numbers[self.index])
+
+    @property
+    def text(self):
+        return self.table.text(self.index)
+
+    @property
+    def sentiment(self):
+        code = self.table.label_codes[self.index]
+        if code == NO_LABEL:
+            return None
+        return {
+            "label": self.table.labels.decode(code),
+            "score": float(self.table.scores[self.index]),
+        }
+
+    def to_dict(self):
+        """
+        Return the sentence in the usual JSON dictionary format.
+
+        """
+        record = {
+            "act": self.act,
+            "scene": self.scene,
+            "speaker": self.speaker,
+            "sentence number": self.sentence_number,
+            "text": self.text,
+        }
+        sentiment = self.sentiment
+        if sentiment is not None:
+            record["sentiment"] = sentiment
+        return record
+
+    def __getitem__(self, key):
+        # Allows row["speaker"], row["text"], ... like the original dicts,
+        # decoding only the requested column
+        attribute = _ROW_KEYS.get(key)
+        value = getattr(self, attribute) if attribute else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __repr__(self):
+        return f"SentenceRow({self.to_dict()!r})"
+
+
+# Subset of the table given by an index array (no copies)
+class SentenceView(Sequence):
+    """
+    Sequence of rows selected by an index array into a SentenceTable.
+    Works with random.sample(), len(), slicing and iteration like a list.
+
+    """
+    __slots__ = ("table", "indices")
+
+    def __init__(self, table, indices):
+        self.table = table
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return SentenceView(self.table, self.indices[i])
+        return SentenceRow(self.table, int(self.indices[i]))
+
+    def __iter__(self):
+        for i in self.indices:
+            yield SentenceRow(self.table, int(i))
+
+    @property
+    def scores(self):
+        return self.table.scores[self.indices]
+
+    @property
+    def numbers(self):
+        return self.table.numbers[self.indices]
+
+    def to_records(self):
+        return [row.to_dict() for row in self]
+
+
+# Struct-of-arrays sentence table
+class SentenceTable:
+    """
+    Compact storage for sentences of one or more plays.
+
+    Columns are NumPy arrays that grow by doubling; the public
+    attributes (act_codes, numbers, scores, ...) are views of the filled part.
+
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.acts = Vocabulary()
+        self.scenes = Vocabulary()
+        self.speakers = Vocabulary()
+        self.labels = Vocabulary()
+
+        self.size = 0
+        self._act_codes = np.zeros(capacity, dtype=np.uint16)
+        self._scene_codes = np.zeros(capacity, dtype=np.uint16)
+        self._speaker_codes = np.zeros(capacity, dtype=np.uint16)
+        self._label_codes = np.full(capacity, NO_LABEL, dtype=np.int8)
+        self._numbers = np.zeros(capacity, dtype=np.int32)
+        self._scores = np.full(capacity, np.nan, dtype=np.float64)
+
+        # All texts in one UTF-8 buffer, sentence i is blob[offsets[i]:offsets[i + 1]]
+        self._text_blob = bytearray()
+        self._text_offsets = np.zeros(capacity + 1, dtype=np.int64)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build a table from sentence dictionaries (e.g. loaded JSON or a lazy reader
+        such as part2_ndjson.iter_sentences(); generators are consumed one record at a time).
+
+        Args:
+            records (iterable of dict): Sentence dictionaries.
+        Returns:
+            SentenceTable: The filled table.
+
+        """
+        capacity = len(records) if hasattr(records, "__len__") else INITIAL_CAPACITY
+        table = cls(capacity=max(capacity, 1))
+        for record in records:
+            table.append(record)
+        return table
+
+    def _grow(self):
+        capacity = 2 * len(self._numbers)
+        for name in ("_act_codes", "_scene_codes", "_speaker_codes", "_numbers"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+        label_codes = np.full(capacity, NO_LABEL, dtype=np.int8)
+        label_codes[:self.size] = self._label_codes[:self.size]
+        self._label_codes = label_codes
+
+        scores = np.full(capacity, np.nan, dtype=np.float64)
+        scores[:self.size] = self._scores[:self.size]
+        self._scores = scores
+
+        offsets = np.zeros(capacity + 1, dtype=np.int64)
+        offsets[:self.size + 1] = self._text_offsets[:self.size + 1]
+        self._text_offsets = offsets
+
+    def append(self, record):
+        """
+        Append one sentence dictionary to the table.
+
+        """
+        if self.size == len(self._numbers):
+            self._grow()
+
+        i = self.size
+        self._act_codes[i] = self.acts.encode(record["act"])
+        self._scene_codes[i] = self.scenes.encode(record["scene"])
+        self._speaker_codes[i] = self.speakers.encode(record["speaker"])
+        self._numbers[i] = record["sentence number"]
+
+        sentiment = record.get("sentiment")
+        if sentiment:
+            self._label_codes[i] = self.labels.encode(sentiment["label"])
+            self._scores[i] = sentiment["score"]
+
+        self._text_blob += record["text"].encode("utf-8")
+        self._text_offsets[i + 1] = len(self._text_blob)
+        self.size += 1
+
+    # Views of the filled part of every column
+    @property
+    def act_codes(self):
+        return self._act_codes[:self.size]
+
+    @property
+    def scene_codes(self):
+        return self._scene_codes[:self.size]
+
+    @property
+    def speaker_codes(self):
+        return self._speaker_codes[:self.size]
+
+    @property
+    def label_codes(self):
+        return self._label_codes[:self.size]
+
+    @property
+    def numbers(self):
+        return self._numbers[:self.size]
+
+    @property
+    def scores(self):
+        return self._scores[:self.size]
+
+    def text(self, index):
+        start, end = self._text_offsets[index], self._text_offsets[index + 1]
+        return self._text_blob[start:end].decode("utf-8")
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("sentence index out of range")
+        return SentenceRow(self, index)
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield SentenceRow(self, i)
+
+    def nbytes(self):
+        """
+        Approximate memory used by the columns and the text buffer in bytes.
+
+        """
+        columns = (self.act_codes, self.scene_codes, self.speaker_codes,
+                   self.label_codes, self.numbers, self.scores)
+        return (sum(c.nbytes for c in columns)
+                + len(self._text_blob) + 8 * (self.size + 1))
+
+    def _group(self, codes, vocabulary):
+        # Stable sort keeps the original sentence order inside each group
+        order = np.argsort(codes, kind="stable")
+        bounds = np.cumsum(np.bincount(codes, minlength=len(vocabulary)))
+        groups = {}
+        start = 0
+        for code, end in enumerate(bounds):
+            if end > start:
+                groups[vocabulary.decode(code)] = SentenceView(self, order[start:end])
+            start = end
+        return groups
+
+    def group_by_speaker(self):
+        """
+        Group sentences by speaker without copying them.
+
+        Returns:
+            dict: Speaker name -> SentenceView, in the same order as
+            group_sentences_by_speaker() in part2_call_API.py.
+
+        """
+        return self._group(self.speaker_codes, self.speakers)
+
+    def group_by_act(self):
+        """
+        Group sentences by act without copying them.
+
+        Returns:
+            dict: Act label -> SentenceView.
+
+        """
+        return self._group(self.act_codes, self.acts)
+
+    def select(self, speakers=None, acts=None, min_score=None):
+        """
+        Select sentences by speaker, act and/or minimum Flair score.
+
+        Args:
+            speakers (list of str): Speakers to keep (None = all).
+            acts (list of str): Acts to keep (None = all).
+            min_score (float): Minimum Flair score (None = no filter).
+        Returns:
+            SentenceView: The matching sentences.
+
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if speakers is not None:
+            codes = [self.speakers.codes[s] for s in speakers if s in self.speakers]
+            mask &= np.isin(self.speaker_codes, codes)
+        if acts is not None:
+            codes = [self.acts.codes[a] for a in acts if a in self.acts]
+            mask &= np.isin(self.act_codes, codes)
+        if min_score is not None:
+            mask &= self.scores >= min_score
+        return SentenceView(self, np.flatnonzero(mask))
+
+    def view(self):
+        return SentenceView(self, np.arange(self.size))
+
+    def to_records(self):
+        return [row.to_dict() for row in self]
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+    from pipeline_profiling import pop_profile_flags, profile_stage
+
+    pop_profile_flags()
+    if len(sys.argv) != 2:
+        print("Usage: python part2_sentence_store.py <sentences_json_file>")
+        sys.exit(1)
+
+    with profile_stage("sentence_store"):
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            records = json.load(f)
+        table = SentenceTable.from_records(records)
+    print(f"Sentences:     {len(table)}")
+    print(f"Speakers:      {len(table.speakers)}")
+    print(f"Table size:    {table.nbytes() / 1024:.1f} KB")
+    for speaker, view in table.group_by_speaker().items():
+        print(f"  {speaker}: {len(view)}")
@@ -14,6 +14,7 @@ Author 2 & Matriculation Number: Qi Xinyan 23-757-511
 
 import pandas as pd
 from collections import defaultdict, Counter
+from pipeline_profiling import pop_profile_flags, profile_stage
 
 # The random 100 extra sampled lines for manual annotation was not included in this statistics analysis
 
@@ -45,6 +46,9 @@ def count_sentiment_per_character(df):
     for _, row in df.iterrows():
         speaker = row["speaker"]
         sentiment = row["gpt_sentiment"]
+        # Rows routed to Flair (see part2_routing.py) have no GPT sentiment
+        if pd.isna(sentiment):
+            continue
         counts[speaker][sentiment] += 1
     return counts
 
@@ -60,6 +64,8 @@ def sentiment_distribution_by_act(df):
     for _, row in df.iterrows():
         act = row["act"]
         sentiment = row["gpt_sentiment"]
+        if pd.isna(sentiment):
+            continue
         counts[act][sentiment] += 1
     return counts
 
@@ -75,6 +81,8 @@ def sentiment_distribution_by_scene(df):
     for _, row in df.iterrows():
         scene = row["scene"]
         sentiment = row["gpt_sentiment"]
+        if pd.isna(sentiment):
+            continue
         counts[scene][sentiment] += 1
     return counts
 
@@ -143,27 +151,41 @@ def print_section(title):
     print(title)
     print("=" * 60)
 
+# Rows without a GPT sentiment (routed to Flair, see part2_routing.py)
+def count_unlabelled(df):
+    """
+    Count the rows that the sentiment counts above skip.
+    Returns:
+        int: Number of rows without gpt_sentiment.
+
+    """
+    return int(df["gpt_sentiment"].isna().sum())
+
 # Main function to run the analysis
 def main():
     df = load_excel(INPUT_PATH)
+    unlabelled = count_unlabelled(df)
 
     # Sentiment per character
     print_section("1) Sentiment Count per Character")
     char_counts = count_sentiment_per_character(df)
     for speaker, cnt in char_counts.items():
         print(f"{speaker}: {dict(cnt)}")
+    print(f"(skipped {unlabelled} rows without GPT sentiment)")
 
     # Sentiment distribution by ACT
     print_section("2) Sentiment Distribution Across Acts")
     act_counts = sentiment_distribution_by_act(df)
     for act, cnt in act_counts.items():
         print(f"{act}: {dict(cnt)}")
+    print(f"(skipped {unlabelled} rows without GPT sentiment)")
 
     # Sentiment distribution by SCENE
     print_section("2b) Sentiment Distribution Across Scenes")
     scene_counts = sentiment_distribution_by_scene(df)
     for scene, cnt in scene_counts.items():
         print(f"{scene}: {dict(cnt)}")
+    print(f"(skipped {unlabelled} rows without GPT sentiment)")
 
     # Total line count check
     print_section("3) Total Line Count Check")
@@ -180,4 +202,6 @@ def main():
     print("\n Analysis complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    pop_profile_flags()
+    with profile_stage("sentiment_stats"):
+        main()
\ No newline at end of file
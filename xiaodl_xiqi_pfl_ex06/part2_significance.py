@@ -0,0 +1,240 @@
+"""
+PCL1 & PfL Exercise 6 - Part 2.1.3 (extension):
+Permutation tests for sentiment differences between speakers and acts
+
+- Tests every speaker pair and every act pair of every play for a difference in
+  emotional intensity (|flair_score|) and in GPT sentiment value (+1 / 0 / -1).
+- Thousands of label shuffles are done as one matrix operation per pair
+  (rng.permuted on a tiled array, then row means), optionally spread over a process pool.
+- Corrects the p-values for multiple comparisons (Holm or Benjamini-Hochberg).
+- Returns a tidy table with one row per pair and metric.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import sys
+from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from part2_agreement import load_plays
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+N_PERMUTATIONS = 5000
+BATCH_SIZE = 1000     # shuffles per matrix operation, bounds memory to BATCH_SIZE x rows
+ALPHA = 0.05
+SENTIMENT_VALUES = {"positive": 1, "neutral": 0, "negative": -1}
+METRICS = ["intensity", "sentiment_value"]
+
+
+# Add the numeric columns that are compared
+def add_metric_columns(df):
+    """
+    Add "intensity" (|flair_score|) and "sentiment_value" (GPT label as +1 / 0 / -1).
+
+    Args:
+        df (pd.DataFrame): Annotation rows.
+    Returns:
+        pd.DataFrame: Copy of df with the two metric columns.
+
+    """
+    df = df.copy()
+    df["intensity"] = pd.to_numeric(df["flair_score"], errors="coerce").abs()
+    df["sentiment_value"] = df["gpt_sentiment"].map(SENTIMENT_VALUES)
+    return df
+
+
+# Two-sided permutation test on the difference of means
+def permutation_test(a, b, n_permutations=N_PERMUTATIONS, seed=42):
+    """
+    Permutation test for mean(a) - mean(b).
+
+    The pooled values are tiled into a (batch, n) matrix and every row is shuffled
+    independently with rng.permuted, so a whole batch of shuffles is one NumPy call.
+
+    Args:
+        a (np.ndarray): Values of the first group.
+        b (np.ndarray): Values of the second group.
+        n_permutations (int): Number of shuffles.
+        seed (int): Random seed.
+    Returns:
+        tuple: (observed difference, p-value)
+
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    observed = a.mean() - b.mean()
+
+    pooled = np.concatenate([a, b])
+    n_a = len(a)
+    rng = np.random.default_rng(seed)
+    extreme = 0
+
+    for start in range(0, n_permutations, BATCH_SIZE):
+        size = min(BATCH_SIZE, n_permutations - start)
+        shuffled = rng.permuted(np.broadcast_to(pooled, (size, len(pooled))), axis=1)
+        diffs = shuffled[:, :n_a].mean(axis=1) - shuffled[:, n_a:].mean(axis=1)
+        # Small tolerance so ties with the observed value count as extreme
+        extreme += np.count_nonzero(np.abs(diffs) >= abs(observed) - 1e-12)
+
+    # +1 in numerator and denominator: the observed split is one of the permutations
+    return observed, (extreme + 1) / (n_permutations + 1)
+
+
+# Worker for one comparison (top-level so it can run in a process pool)
+def _run_comparison(job):
+    comparison, a, b, n_permutations, seed = job
+    diff, p_value = permutation_test(a, b, n_permutations, seed)
+    return dict(
+        comparison,
+        n_a=len(a),
+        n_b=len(b),
+        mean_a=a.mean(),
+        mean_b=b.mean(),
+        diff=diff,
+        p_value=p_value,
+    )
+
+
+# All pairwise comparisons within each play
+def build_jobs(df, dimension, n_permutations, seed):
+    """
+    Collect one job per play, group pair and metric.
+
+    Args:
+        df (pd.DataFrame): Rows with play, metric columns and the dimension column.
+        dimension (str): "speaker" or "act".
+        n_permutations (int): Shuffles per test.
+        seed (int): Random seed.
+    Returns:
+        list: Jobs for _run_comparison().
+
+    """
+    jobs = []
+    for play, play_df in df.groupby("play", sort=False):
+        for metric in METRICS:
+            values = {
+                group: g[metric].dropna().to_numpy()
+                for group, g in play_df.groupby(dimension, sort=False)
+            }
+            for group_a, group_b in combinations(values, 2):
+                a, b = values[group_a], values[group_b]
+                if len(a) < 2 or len(b) < 2:
+                    continue
+                comparison = {
+                    "play": play, "dimension": dimension, "metric": metric,
+                    "group_a": group_a, "group_b": group_b,
+                }
+                jobs.append((comparison, a, b, n_permutations, seed))
+    return jobs
+
+
+# Multiple-comparison correction
+def adjust_p_values(p_values, method="holm"):
+    """
+    Adjust p-values for multiple comparisons.
+
+    Args:
+        p_values (array-like): Raw p-values.
+        method (str): "holm" (family-wise error) or "fdr_bh" (Benjamini-Hochberg).
+    Returns:
+        np.ndarray: Adjusted p-values in the original order.
+
+    """
+    p = np.asarray(p_values, dtype=np.float64)
+    m = len(p)
+    if m == 0:
+        return p
+
+    order = np.argsort(p)
+    ranked = p[order]
+
+    if method == "holm":
+        adjusted = np.maximum.accumulate((m - np.arange(m)) * ranked)
+    elif method == "fdr_bh":
+        adjusted = np.minimum.accumulate((m / np.arange(m, 0, -1) * ranked[::-1]))[::-1]
+    else:
+        raise ValueError(f"Unknown correction method {method!r}")
+
+    result = np.empty(m)
+    result[order] = np.minimum(adjusted, 1.0)
+    return result
+
+
+# Run all tests and return a tidy table
+def significance_table(df, dimensions=("speaker", "act"), n_permutations=N_PERMUTATIONS,
+                       method="holm", workers=1, seed=42):
+    """
+    Run permutation tests for every speaker pair and act pair of every play.
+
+    Args:
+        df (pd.DataFrame): Annotation rows (see load_plays() in part2_agreement.py).
+        dimensions (tuple of str): Columns whose groups are compared.
+        n_permutations (int): Shuffles per test.
+        method (str): Correction method, "holm" or "fdr_bh".
+        workers (int): Number of worker processes (1 = run in this process).
+        seed (int): Random seed.
+    Returns:
+        pd.DataFrame: One row per comparison with raw and adjusted p-values.
+
+    """
+    df = add_metric_columns(df)
+    jobs = []
+    for dimension in dimensions:
+        jobs.extend(build_jobs(df, dimension, n_permutations, seed))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(_run_comparison, jobs, chunksize=4))
+    else:
+        rows = [_run_comparison(job) for job in jobs]
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+
+    table["p_adjusted"] = adjust_p_values(table["p_value"], method)
+    table["significant"] = table["p_adjusted"] < ALPHA
+    return table
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python part2_significance.py <excel_file> [<excel_file> ...] [--workers N] [--permutations N] [--method holm|fdr_bh]
+    Returns excel_paths, workers, n_permutations, method.
+
+    """
+    args = sys.argv[1:]
+    options = {"--workers": "1", "--permutations": str(N_PERMUTATIONS), "--method": "holm"}
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1] if i + 1 < len(args) else ""
+            del args[i:i + 2]
+
+    if not args or options["--method"] not in ("holm", "fdr_bh"):
+        print("Error: Missing or invalid arguments\n")
+        print("Usage: python part2_significance.py <excel_file> [<excel_file> ...] "
+              "[--workers N] [--permutations N] [--method holm|fdr_bh]\n")
+        print("Example:")
+        print("  python part2_significance.py sentiment_analysis_hamlet.xlsx --workers 4")
+        sys.exit(1)
+
+    return args, int(options["--workers"]), int(options["--permutations"]), options["--method"]
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    paths, workers, n_permutations, method = system_setup()
+
+    with profile_stage("significance"):
+        table = significance_table(
+            load_plays(paths), n_permutations=n_permutations, method=method, workers=workers
+        )
+
+    with pd.option_context("display.width", 200, "display.max_rows", None,
+                           "display.float_format", "{:.4f}".format):
+        print(table.to_string(index=False))
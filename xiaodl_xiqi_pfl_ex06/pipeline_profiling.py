@@ -0,0 +1,202 @@
+"""
+PCL1 & PfL Exercise 6 (extension):
+Profiling hooks for all pipeline scripts
+
+- Every script accepts --profile (plus optional --profile-dir DIR and --profile-sample FRACTION).
+- profile_stage() runs a stage under cProfile and tracemalloc and writes
+  <stage>.prof (open with snakeviz or pstats) and <stage>_summary.txt
+  (wall time, top functions by cumulative time, top allocation sites, peak memory).
+  Threads started during the stage (worker pools, HTTP handler threads, the
+  streaming producer / consumers) get their own profiler, merged into the same output.
+- sampled_call() records a configurable fraction of GPT / Flair calls in detail
+  (wall time, CPU time, allocated memory) to <name>_calls.tsv.
+- Without --profile all hooks do nothing, so production runs are unchanged.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import pstats
+import cProfile
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_DIR = "profiles"
+SAMPLE_FRACTION = 0.05  # share of GPT / Flair calls recorded in detail
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+# Active configuration, None while profiling is disabled
+_config = None
+
+
+# Read and remove the profiling flags from the command line
+def pop_profile_flags(argv=None):
+    """
+    Enable profiling if --profile is on the command line.
+
+    The flags are removed from argv so that each script's own argument
+    checks (system_setup() etc.) see the usual arguments.
+
+    Args:
+        argv (list of str): Argument list to edit in place (default: sys.argv).
+    Returns:
+        dict: The profiling configuration, or None if --profile was not given.
+
+    """
+    global _config
+    argv = sys.argv if argv is None else argv
+
+    options = {"--profile-dir": PROFILE_DIR, "--profile-sample": str(SAMPLE_FRACTION)}
+    for flag in options:
+        if flag in argv:
+            i = argv.index(flag)
+            options[flag] = argv[i + 1] if i + 1 < len(argv) else options[flag]
+            del argv[i:i + 2]
+
+    if "--profile" not in argv:
+        return None
+    argv.remove("--profile")
+
+    _config = {
+        "dir": options["--profile-dir"],
+        "sample": float(options["--profile-sample"]),
+    }
+    os.makedirs(_config["dir"], exist_ok=True)
+    print(f"Profiling enabled, writing to {_config['dir']}/ "
+          f"(sampling {_config['sample']:.0%} of model calls)")
+    return _config
+
+
+def profiling_enabled():
+    return _config is not None
+
+
+# Write the text summary of one stage
+def _write_summary(name, stats, n_threads, snapshot, wall, peak):
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+    path = os.path.join(_config["dir"], f"{name}_summary.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Stage: {name}\n")
+        f.write(f"Wall time: {wall:.3f} s\n")
+        f.write(f"Threads profiled: {n_threads} (calling thread + threads started during the stage; "
+                f"threads that already existed are not included)\n")
+        f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MB\n\n")
+        f.write(f"Top {TOP_ALLOCATIONS} allocation sites (still allocated at stage end):\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            f.write(f"  {stat}\n")
+        f.write(f"\nTop {TOP_FUNCTIONS} functions by cumulative time:\n")
+        f.write(stream.getvalue())
+    return path
+
+
+# Profile one pipeline stage
+@contextmanager
+def profile_stage(name):
+    """
+    Run the enclosed block under cProfile and tracemalloc if profiling is enabled.
+
+    Usage:
+        with profile_stage("process_file"):
+            process_file(...)
+
+    Args:
+        name (str): Stage name, used for the output file names.
+
+    """
+    if _config is None:
+        yield
+        return
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    # cProfile only sees the thread that enables it, so every thread started
+    # during the stage enables its own profiler on its first call
+    thread_profilers = []
+    lock = threading.Lock()
+
+    def start_thread_profiler(frame, event, arg):
+        thread_profiler = cProfile.Profile()
+        with lock:
+            thread_profilers.append(thread_profiler)
+        thread_profiler.enable()
+
+    previous_hook = threading.getprofile()
+    threading.setprofile(start_thread_profiler)
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        threading.setprofile(previous_hook)
+        wall = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+
+        stats = pstats.Stats(profiler)
+        with lock:
+            for thread_profiler in thread_profilers:
+                stats.add(thread_profiler)
+            n_threads = 1 + len(thread_profilers)
+
+        stats.dump_stats(os.path.join(_config["dir"], f"{name}.prof"))
+        path = _write_summary(name, stats, n_threads, snapshot, wall, peak)
+        print(f"[profile] {name}: {wall:.2f} s, summary in {path}")
+
+
+# Record a fraction of expensive calls in detail
+def sampled_call(name):
+    """
+    Decorator for GPT / Flair calls. While profiling is enabled, a random
+    fraction of the calls (--profile-sample) is timed in detail and appended
+    to <name>_calls.tsv: wall time, CPU time and memory allocated during the call.
+
+    cProfile is not used here because a stage profiler may already be active.
+
+    Args:
+        name (str): Name of the call, used for the output file name.
+
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _config is None or random.random() >= _config["sample"]:
+                return func(*args, **kwargs)
+
+            tracing = tracemalloc.is_tracing()
+            before = tracemalloc.get_traced_memory()[0] if tracing else 0
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                wall = time.perf_counter() - wall_start
+                cpu = time.process_time() - cpu_start
+                allocated = tracemalloc.get_traced_memory()[0] - before if tracing else 0
+
+                path = os.path.join(_config["dir"], f"{name}_calls.tsv")
+                new_file = not os.path.exists(path)
+                with open(path, "a", encoding="utf-8") as f:
+                    if new_file:
+                        f.write("timestamp\twall_s\tcpu_s\tallocated_bytes\n")
+                    f.write(f"{time.time():.3f}\t{wall:.6f}\t{cpu:.6f}\t{allocated}\n")
+        return wrapper
+    return decorator
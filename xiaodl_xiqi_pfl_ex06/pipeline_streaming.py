@@ -0,0 +1,281 @@
+"""
+PCL1 & PfL Exercise 6 (extension):
+Streaming pipeline from Flair scoring straight into GPT annotation
+
+- Producer: reads sentences lazily (JSON array or NDJSON), scores them with Flair
+  in chunks and pushes lines with score >= 0.9 into a bounded queue.
+- Consumers: a pool of GPT worker threads takes lines from the queue and annotates them
+  (optionally with the confidence-based routing of part2_routing.py).
+- Sink: results are put back into the original order with a small heap and written
+  as soon as they are contiguous (NDJSON), and to Excel at the end.
+- The bounded queue gives backpressure: if GPT is slower, Flair waits instead of
+  filling memory; if Flair is slower, the workers wait. Wall time approaches the
+  slower stage instead of the sum of both.
+
+Author 1 & Matriculation Number: Liu Xiaoduan 23-749-609
+Author 2 & Matriculation Number: Qi Xinyan 23-757-511
+"""
+
+import sys
+import json
+import time
+import heapq
+import queue
+import threading
+from openai import OpenAI
+from part1_flair_backends import BACKENDS, CONFIDENCE_THRESHOLD, load_classifier, score_sentences
+from part2_call_API import analyze_with_gpt, save_to_excel
+from part2_ndjson import iter_sentences
+from part2_routing import ROUTING_POLICY, load_cache, save_cache, annotate_sentence, summarize_sources
+from pipeline_profiling import pop_profile_flags, profile_stage
+
+QUEUE_SIZE = 64         # lines waiting for GPT; bounds memory and applies backpressure
+FLAIR_CHUNK_SIZE = 256  # lines per Flair call, sorted by length inside the call
+GPT_WORKERS = 8         # concurrent GPT requests
+DEFAULT_SPEAKERS = ["KING CLAUDIUS", "HAMLET"]
+
+_DONE = object()  # end-of-stream marker
+
+
+# Read n items at a time from an iterator
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Flair stage
+def produce(sentences, score_batch, work_queue, n_workers, stats, errors,
+            chunk_size=FLAIR_CHUNK_SIZE, threshold=CONFIDENCE_THRESHOLD):
+    """
+    Score sentences chunk by chunk and push high-confidence lines into the work queue.
+
+    Args:
+        sentences (iterable of dict): Sentences to score (may be a generator).
+        score_batch (callable): Adds "sentiment" to a list of sentence dicts.
+        work_queue (queue.Queue): Bounded queue towards the GPT workers.
+        n_workers (int): Number of workers; each receives one end marker.
+        stats (dict): Counters updated by this stage.
+        errors (list): Exceptions raised in this thread are appended here.
+        chunk_size (int): Sentences per score_batch() call. Larger chunks let Flair
+            group lines of similar length, smaller ones reach GPT sooner.
+        threshold (float): Minimum Flair score to forward a line.
+
+    """
+    seq = 0
+    try:
+        for batch in batched(sentences, chunk_size):
+            start = time.perf_counter()
+            score_batch(batch)
+            stats["flair_seconds"] += time.perf_counter() - start
+            stats["scored"] += len(batch)
+
+            for item in batch:
+                if item["sentiment"]["score"] >= threshold:
+                    # Blocks while the queue is full (backpressure)
+                    work_queue.put((seq, item))
+                    seq += 1
+    except Exception as e:
+        errors.append(e)
+    finally:
+        stats["forwarded"] = seq
+        for _ in range(n_workers):
+            work_queue.put(_DONE)
+
+
+# GPT stage (one per worker thread)
+def consume(work_queue, result_queue, annotate, errors):
+    """
+    Take lines from the work queue, annotate them and pass them on to the sink.
+
+    Args:
+        work_queue (queue.Queue): Lines from the Flair stage.
+        result_queue (queue.Queue): Annotated rows towards the sink.
+        annotate (callable): item -> (source, {"main_emotion", "sentiment"}).
+        errors (list): Exceptions raised in this thread are appended here.
+
+    """
+    try:
+        while True:
+            job = work_queue.get()
+            if job is _DONE:
+                break
+            seq, item = job
+            source, result = annotate(item)
+            result_queue.put((seq, {
+                "act": item["act"],
+                "scene": item["scene"],
+                "speaker": item["speaker"],
+                "sentence number": item["sentence number"],
+                "text": item["text"],
+                "flair_label": item["sentiment"]["label"],
+                "flair_score": item["sentiment"]["score"],
+                "gpt_main_emotion": result.get("main_emotion"),
+                "gpt_sentiment": result.get("sentiment"),
+                "annotation_source": source,
+            }))
+    except Exception as e:
+        errors.append(e)
+        # Keep draining so the producer is never blocked on a full queue
+        while work_queue.get() is not _DONE:
+            pass
+    finally:
+        result_queue.put(_DONE)
+
+
+# Run both stages concurrently and collect the ordered output
+def run_streaming_pipeline(sentences, score_batch, annotate, n_workers=GPT_WORKERS,
+                           queue_size=QUEUE_SIZE, ndjson_path=None):
+    """
+    Run Flair scoring and GPT annotation as overlapping stages.
+
+    Args:
+        sentences (iterable of dict): Input sentences, read lazily.
+        score_batch (callable): Flair stage, adds "sentiment" to a list of sentences.
+        annotate (callable): GPT stage, item -> (source, result).
+        n_workers (int): Number of GPT worker threads.
+        queue_size (int): Capacity of the queue between the stages.
+        ndjson_path (str): If given, rows are streamed there in order as they complete.
+    Returns:
+        tuple: (rows in input order, stats dict)
+
+    """
+    work_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue()
+    errors = []
+    stats = {"scored": 0, "forwarded": 0, "flair_seconds": 0.0}
+
+    start = time.perf_counter()
+    threads = [threading.Thread(
+        target=produce,
+        args=(sentences, score_batch, work_queue, n_workers, stats, errors),
+        name="flair-producer", daemon=True,
+    )]
+    threads += [
+        threading.Thread(
+            target=consume, args=(work_queue, result_queue, annotate, errors),
+            name=f"gpt-worker-{i}", daemon=True,
+        )
+        for i in range(n_workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Sink: reorder by sequence number and emit contiguous rows immediately
+    rows = []
+    pending = []
+    next_seq = 0
+    finished = 0
+    out = open(ndjson_path, "w", encoding="utf-8") if ndjson_path else None
+    try:
+        while finished < n_workers:
+            message = result_queue.get()
+            if message is _DONE:
+                finished += 1
+                continue
+            heapq.heappush(pending, message)
+            while pending and pending[0][0] == next_seq:
+                _, row = heapq.heappop(pending)
+                rows.append(row)
+                if out:
+                    out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    out.flush()
+                next_seq += 1
+    finally:
+        if out:
+            out.close()
+
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    stats["wall_seconds"] = time.perf_counter() - start
+    stats["annotated"] = len(rows)
+    return rows, stats
+
+
+# CLI Setup
+def system_setup():
+    """
+    Setup command line arguments:
+    python pipeline_streaming.py <input_json_file> <output_excel_file>
+        [--speakers "KING CLAUDIUS,HAMLET"] [--backend full|int8|onnx]
+        [--workers N] [--queue-size N] [--ndjson FILE] [--route]
+    Returns input_path, output_path and the options.
+
+    """
+    args = sys.argv[1:]
+    options = {
+        "--speakers": ",".join(DEFAULT_SPEAKERS),
+        "--backend": "full",
+        "--workers": str(GPT_WORKERS),
+        "--queue-size": str(QUEUE_SIZE),
+        "--ndjson": None,
+    }
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1] if i + 1 < len(args) else ""
+            del args[i:i + 2]
+
+    options["--route"] = "--route" in args
+    if options["--route"]:
+        args.remove("--route")
+
+    if len(args) != 2 or options["--backend"] not in BACKENDS:
+        print("Error: Missing or invalid arguments\n")
+        print("Usage: python pipeline_streaming.py <input_json_file> <output_excel_file> "
+              "[--speakers \"A,B\"] [--backend full|int8|onnx] [--workers N] "
+              "[--queue-size N] [--ndjson FILE] [--route]\n")
+        print("Example:")
+        print("  python pipeline_streaming.py all_sentences_hamlet.json "
+              "sentiment_analysis_hamlet.xlsx --backend int8 --workers 8")
+        sys.exit(1)
+
+    return args[0], args[1], options
+
+
+if __name__ == "__main__":
+    pop_profile_flags()
+    input_path, output_path, options = system_setup()
+
+    classifier = load_classifier(options["--backend"])
+    client = OpenAI()
+    cache = load_cache() if options["--route"] else None
+
+    def score_batch(batch):
+        score_sentences(batch, classifier)
+
+    # The cache dict is shared by all workers; single get / set calls are thread-safe
+    def annotate(item):
+        if not options["--route"]:
+            return "gpt", analyze_with_gpt(item["text"], client)
+        return annotate_sentence(item, client, cache, ROUTING_POLICY, analyze_with_gpt)
+
+    speakers = [s.strip() for s in options["--speakers"].split(",") if s.strip()]
+    sentences = iter_sentences(input_path, speakers=speakers or None)
+
+    print("Streaming Flair -> GPT...")
+    with profile_stage("streaming_pipeline"):
+        rows, stats = run_streaming_pipeline(
+            sentences, score_batch, annotate,
+            n_workers=int(options["--workers"]),
+            queue_size=int(options["--queue-size"]),
+            ndjson_path=options["--ndjson"],
+        )
+
+    if options["--route"]:
+        save_cache(cache)
+        summary = summarize_sources([row["annotation_source"] for row in rows])
+        print(f"{summary['avoided']:.1%} of GPT calls avoided")
+
+    save_to_excel(rows, output_path)
+    print(f"Scored {stats['scored']} lines, forwarded {stats['forwarded']}, "
+          f"annotated {stats['annotated']}")
+    print(f"Flair time {stats['flair_seconds']:.1f} s, total wall time {stats['wall_seconds']:.1f} s")